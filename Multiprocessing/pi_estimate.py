@@ -38,14 +38,16 @@ def calc_point_inside_circle(num_of_estimates):
 
 
 
-from multiprocessing import Pool # This is process based
-
 # from multiprocessing import Pool # This is thread based
 
 import time
 
 
 
+from worker_pool import get_pool, shutdown_pools
+
+
+
 if __name__ == "__main__":
 
     total_trials = 1e8
@@ -54,7 +56,7 @@ if __name__ == "__main__":
 
 
 
-    pool = Pool(processes=num_workers)
+    pool = get_pool(num_workers)
 
     trials_per_worker = total_trials/num_workers
 
@@ -72,3 +74,5 @@ if __name__ == "__main__":
 
     print(f"Time consumed: {time.time()-start_time}")
 
+    shutdown_pools()
+
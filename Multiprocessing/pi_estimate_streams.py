@@ -0,0 +1,124 @@
+
+import os
+import time
+from math import sqrt
+
+import numpy as np
+
+from worker_pool import get_pool, imap_bounded, shutdown_pools
+
+def count_inside_circle(num_of_estimates, seed_sequence, block_size=1 << 16):
+    '''
+    Count how many of num_of_estimates random points in the unit square fall inside the circle.
+    Points are drawn block_size at a time into the same two buffers, so memory stays constant
+    whatever num_of_estimates is.
+    '''
+    rng = np.random.default_rng(seed_sequence)
+    xs = np.empty(block_size)
+    ys = np.empty(block_size)
+
+    trials_inside_circle = 0
+    remaining = int(num_of_estimates)
+    while remaining:
+        n = min(block_size, remaining)
+        x, y = xs[:n], ys[:n]
+        rng.random(out=x)
+        rng.random(out=y)
+        x *= x
+        y *= y
+        x += y
+        trials_inside_circle += int(np.count_nonzero(x <= 1))
+        remaining -= n
+    return trials_inside_circle
+
+def count_chunk(task):
+    return count_inside_circle(*task)
+
+def create_chunks(total_trials, chunk_size, seed):
+    '''
+    Yield (trials, seed_sequence) for every chunk. Every chunk gets its own stream spawned from the
+    seed in chunk order, so the result only depends on the seed and the chunk size and never on
+    how many workers there are or which worker draws which chunk.
+    '''
+    root = np.random.SeedSequence(seed)
+    remaining = int(total_trials)
+    while remaining:
+        trials = min(chunk_size, remaining)
+        yield trials, root.spawn(1)[0]
+        remaining -= trials
+
+def iter_pi_estimates(total_trials, seed=None, num_workers=None, chunk_size=1_000_000):
+    '''
+    Estimate pi chunk by chunk over the persistent pool of workers. Yields (pi_estimate,
+    standard_error, trials) after every chunk, in chunk order, so a caller can stop as soon as the
+    estimate is good enough. Two chunks per worker are in flight, those are left to drain on a stop.
+    '''
+    if num_workers is None:
+        num_workers = os.cpu_count()
+
+    def estimates(counts):
+        inside = trials = 0
+        for (chunk_trials, _), chunk_inside in zip(create_chunks(total_trials, chunk_size, seed), counts):
+            inside += chunk_inside
+            trials += chunk_trials
+            p = inside / trials
+            yield 4 * p, 4 * sqrt(p * (1 - p) / trials), trials
+
+    chunks = create_chunks(total_trials, chunk_size, seed)
+    if num_workers == 1:
+        yield from estimates(map(count_chunk, chunks))
+        return
+    yield from estimates(imap_bounded(get_pool(num_workers), count_chunk, chunks, 2 * num_workers))
+
+def estimate_pi(total_trials, seed=None, num_workers=None, chunk_size=1_000_000, target_error=None):
+    '''
+    Estimate pi with at most total_trials points, stopping early once the standard error drops
+    below target_error. Returns (pi_estimate, standard_error, trials).
+    '''
+    result = (float('nan'), float('inf'), 0)
+    for result in iter_pi_estimates(total_trials, seed, num_workers, chunk_size):
+        if target_error is not None and result[1] < target_error:
+            break
+    return result
+
+TRIAL_UNIT = 1_000_000 # Trials per stream of the scheduled estimate, the scheduler hands out whole units
+
+def count_inside_circle_units(start, stop, seed, total_trials):
+    '''
+    Chunk of the scheduler, units start to stop. Every unit draws its own stream spawned from the
+    seed and the unit index, so the result does not depend on how the units were chunked.
+    '''
+    inside = 0
+    for unit in range(start, stop):
+        trials = min(TRIAL_UNIT, total_trials - unit * TRIAL_UNIT)
+        inside += count_inside_circle(trials, np.random.SeedSequence(seed, spawn_key=(unit,)))
+    return inside
+
+def estimate_pi_scheduled(total_trials, seed=None, num_workers=None, schedule='guided'):
+    '''
+    Estimate pi with the trials handed out by the scheduler in units of TRIAL_UNIT. Returns
+    (pi_estimate, standard_error) and the per worker busy/idle records. The estimate only depends
+    on the seed, never on the number of workers or the schedule.
+    '''
+    from scheduler import run_scheduled
+    total_trials = int(total_trials)
+    if seed is None:
+        seed = np.random.SeedSequence().entropy # Every unit has to share one seed
+    num_units = -(-total_trials // TRIAL_UNIT)
+    results, stats = run_scheduled(count_inside_circle_units, num_units, (seed, total_trials), num_workers, schedule)
+    p = sum(inside for _, _, inside in results) / total_trials
+    return (4 * p, 4 * sqrt(p * (1 - p) / total_trials)), stats
+
+if __name__ == "__main__":
+    total_trials = 1e8
+
+    for num_workers in (1, 2, 4):
+        start_time = time.time()
+        pi_estimate, error, trials = estimate_pi(total_trials, seed=12345, num_workers=num_workers)
+        print(f"{num_workers} workers: {pi_estimate} +- {error:.1e} from {trials:,} trials, "
+              f"time consumed: {time.time()-start_time:0.2f}")
+
+    start_time = time.time()
+    pi_estimate, error, trials = estimate_pi(total_trials, seed=12345, num_workers=4, target_error=5e-4)
+    print(f"Early stop: {pi_estimate} +- {error:.1e} from {trials:,} trials, time consumed: {time.time()-start_time:0.2f}")
+    shutdown_pools()
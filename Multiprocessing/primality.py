@@ -0,0 +1,112 @@
+
+import math
+import time
+
+from verify_prime_less_naive import create_range
+
+# With the first 13 primes as witnesses Miller-Rabin gives the exact answer for every n below
+# psi_13, the smallest strong pseudoprime to all of them (> 2^64). The first 12 only reach psi_12.
+WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+DETERMINISTIC_LIMIT = 3317044064679887385961981 # psi_13
+PSI_12 = 318665857834031151167461 # 399165290221 * 798330580441, passes every witness up to 37
+
+def is_prime(n):
+    '''
+    Deterministic Miller-Rabin, exact for n < DETERMINISTIC_LIMIT which covers all 64 bit numbers.
+    Takes microseconds where trial division up to sqrt(n) takes seconds.
+    '''
+    if n >= DETERMINISTIC_LIMIT:
+        raise ValueError(f'{n} is too large for the deterministic witness set')
+    if n < 2:
+        return False
+    for p in WITNESSES:
+        if n % p == 0:
+            return n == p
+
+    # n - 1 = d * 2^s with d odd
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    for a in WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def check_primes(numbers):
+    """is_prime for a batch of numbers"""
+    return [is_prime(n) for n in numbers]
+
+def find_factor_in_range(n_from_i_to_i):
+    """Smallest odd divisor of n in [from_i, to_i), None if there is none"""
+    (n, (from_i, to_i)) = n_from_i_to_i
+    if (from_i % 2 == 0):
+        from_i = from_i + 1
+    for i in range(from_i, int(to_i), 2):
+        if n % i == 0:
+            return i
+    return None
+
+def smallest_factor(n, pool=None, num_processes=4):
+    '''
+    Smallest prime factor of n, None when n is prime. Miller-Rabin answers first, only composite
+    numbers go through the parallel trial division of the verify_prime scripts.
+    '''
+    if n < 2 or is_prime(n):
+        return None
+    if n % 2 == 0:
+        return 2
+
+    ranges_to_check = create_range(3, math.isqrt(n) + 1, num_processes)
+    tasks = zip(num_processes*[n], ranges_to_check)
+    results = pool.map(find_factor_in_range, tasks) if pool is not None else map(find_factor_in_range, tasks)
+    return min(factor for factor in results if factor is not None)
+
+def throughput_report(numbers, pool, num_processes=4):
+    """Numbers/second of the Miller-Rabin batch against check_prime of verify_prime_less_naive"""
+    from verify_prime_less_naive import check_prime
+
+    st = time.time()
+    expected = [check_prime(n, pool, num_processes) for n in numbers]
+    trial_seconds = time.time() - st
+
+    repeats = 1000
+    st = time.time()
+    for _ in range(repeats):
+        results = check_primes(numbers)
+    miller_rabin_seconds = (time.time() - st) / repeats
+
+    assert results == expected
+    print(f'Trial division: {len(numbers) / trial_seconds:,.2f} numbers/s')
+    print(f'Miller-Rabin:   {len(numbers) / miller_rabin_seconds:,.0f} numbers/s')
+
+if __name__ == '__main__':
+    from worker_pool import get_pool, shutdown_pools
+
+    #[non_prime, non_prime, non_prime, prime, prime]
+    test_cases = [112272535095295, 100109100129100369, 100109100129101027, 100109100129100151, 100109100129162907]
+
+    num_of_workers = 4
+    pool = get_pool(num_of_workers)
+
+    for n in test_cases:
+        st = time.time()
+        print(f'The Value {n} is a prime: {is_prime(n)} (Took {time.time() - st:0.6f} seconds)')
+
+    for n in test_cases[:3]:
+        st = time.time()
+        print(f'Smallest factor of {n}: {smallest_factor(n, pool, num_of_workers)} (Took {time.time() - st:0.2f} seconds)')
+
+    assert not is_prime(PSI_12) and PSI_12 == 399165290221 * 798330580441
+    assert is_prime(399165290221) and is_prime(798330580441)
+
+    throughput_report(test_cases, pool, num_of_workers)
+    shutdown_pools()
@@ -1,12 +1,21 @@
 
 import multiprocessing
-from multiprocessing import Pool
 import time
 import math
 
 FLAG_ALL_DONE = b"WORK_FINISHED"
 FLAG_WORKER_FINISHED_PROCESSING = b"WORKER_FINISHED_PROCESSING"
 
+def is_prime(n):
+    if n < 3:
+        return n == 2
+    if n % 2 == 0:
+        return False
+    for i in range(3, int(math.sqrt(n)) + 1, 2):
+        if n % i == 0:
+            return False
+    return True
+
 def check_prime(search_space_queue, verified_primes_queue):
 
     while True:
@@ -17,49 +26,62 @@ def check_prime(search_space_queue, verified_primes_queue):
             verified_primes_queue.put(FLAG_WORKER_FINISHED_PROCESSING)
             break
         else:
-            if n % 2 == 0:
-                continue
-            for i in range(3, int(math.sqrt(n)) + 1, 2):
-                if n % i == 0:
-                    break
-            else:
+            if is_prime(n):
                 verified_primes_queue.put(n)
 
+def check_prime_batched(search_space_queue, verified_primes_queue):
+    '''
+    Same protocol as check_prime, but every job is a (from_i, to_i) range of numbers and the primes
+    of a range go back as one list. One queue round trip per batch instead of one per number.
+    '''
+    while True:
+        job = search_space_queue.get()
 
-if __name__ == '__main__':
-
-    num_of_workers = 4
-
-    primes = []
-    manager = multiprocessing.Manager()
-    search_space_queue = manager.Queue()
-    verified_primes_queue = manager.Queue()
-
-    pool = Pool(processes=num_of_workers)
+        if job == FLAG_ALL_DONE:
+            verified_primes_queue.put(FLAG_WORKER_FINISHED_PROCESSING)
+            break
+        else:
+            from_i, to_i = job
+            verified_primes_queue.put([n for n in range(from_i, to_i) if is_prime(n)])
+
+def search_primes(number_range, num_of_workers, batch_size=None):
+    '''
+    Find the primes in number_range with num_of_workers processes fed through queues.
+    Without batch_size every number is its own job on Manager queues, how this script always did it.
+    With batch_size the jobs are ranges of batch_size numbers on plain multiprocessing queues.
+    '''
+    if batch_size is None:
+        manager = multiprocessing.Manager()
+        queue_factory = manager.Queue
+    else:
+        queue_factory = multiprocessing.Queue
+    search_space_queue = queue_factory()
+    verified_primes_queue = queue_factory()
 
     # Initializing the child processes.
     processes = []
     for _ in range(num_of_workers):
-        p = multiprocessing.Process(target=check_prime, 
-                                    args=(  search_space_queue, 
+        p = multiprocessing.Process(target=check_prime if batch_size is None else check_prime_batched,
+                                    args=(  search_space_queue,
                                             verified_primes_queue)
                                     )
         processes.append(p)
         p.start()
 
-    # Actual calculations begin here!
-    t1 = time.time()
-    number_range = range(100_000_000, 101_000_000)
-
     # add jobs to the inbound work queue
-    for number in number_range:
-        search_space_queue.put(number)
+    if batch_size is None:
+        for number in number_range:
+            search_space_queue.put(number)
+    else:
+        for from_i in range(number_range.start, number_range.stop, batch_size):
+            search_space_queue.put((from_i, min(from_i + batch_size, number_range.stop)))
 
     # add poison pills to stop the remote workers(force to break from the infinite loop)
     for n in range(num_of_workers):
         search_space_queue.put(FLAG_ALL_DONE)
 
     # Now wait till child processes complete their tasks.
+    primes = []
     finished_child_processes = 0
     while True:
         new_result = verified_primes_queue.get() # Wait till a child process put a result to the queue
@@ -67,10 +89,45 @@ if __name__ == '__main__':
             finished_child_processes += 1
             if finished_child_processes == num_of_workers:
                 break
-        else:
+        elif batch_size is None:
             primes.append(new_result)
+        else:
+            primes.extend(new_result)
 
     assert finished_child_processes == num_of_workers
 
-    print("Took:", time.time() - t1)
-    print(len(primes), primes[:10], primes[-10:])
+    # Every worker has sent its last result, so they can all exit now
+    for p in processes:
+        p.join()
+    return primes
+
+def primes_in_chunk(start, stop, from_i):
+    return [n for n in range(from_i + start, from_i + stop) if is_prime(n)]
+
+def search_primes_scheduled(number_range, num_of_workers, schedule='guided'):
+    '''
+    Find the primes in number_range with the chunks handed out by the scheduler instead of queues.
+    Returns the primes and the per worker busy/idle records.
+    '''
+    from scheduler import run_scheduled
+    results, stats = run_scheduled(primes_in_chunk, len(number_range), (number_range.start,),
+                                   num_of_workers, schedule, min_chunk=1000)
+    return [n for _, _, primes in results for n in primes], stats
+
+
+if __name__ == '__main__':
+
+    num_of_workers = 4
+    number_range = range(100_000_000, 101_000_000)
+
+    # Actual calculations begin here!
+    results = {}
+    for name, batch_size in (('manager queue, one number per job', None), ('plain queue, batches of 10,000', 10_000)):
+        t1 = time.time()
+        primes = search_primes(number_range, num_of_workers, batch_size)
+        seconds = time.time() - t1
+        results[name] = sorted(primes)
+        print(f"{name}: took {seconds:0.2f} seconds, {len(number_range) / seconds:,.0f} numbers/s")
+        print(len(primes), sorted(primes)[:10], sorted(primes)[-10:])
+
+    assert len(set(map(tuple, results.values()))) == 1
@@ -0,0 +1,76 @@
+
+import math
+import time
+
+import numpy as np
+
+from worker_pool import get_pool
+
+SEGMENT_SIZE = 1 << 18 # Numbers per segment, the bool segment fits into L2
+
+def base_primes(limit):
+    """All primes <= limit as an int64 array, plain Sieve of Eratosthenes"""
+    if limit < 2:
+        return np.empty(0, dtype=np.int64)
+    is_prime = np.ones(limit + 1, dtype=bool)
+    is_prime[:2] = False
+    for p in range(2, math.isqrt(limit) + 1):
+        if is_prime[p]:
+            is_prime[p * p::p] = False
+    return np.flatnonzero(is_prime).astype(np.int64)
+
+def sieve_segment(lo_hi_base):
+    '''
+    Primes in [lo, hi) as an int64 array. base has to hold every prime up to sqrt(hi), each of
+    them crosses out its multiples in the segment with one strided slice assignment.
+    '''
+    (lo, hi, base) = lo_hi_base
+    segment = np.ones(hi - lo, dtype=bool)
+    if lo < 2:
+        segment[:2 - lo] = False
+    for p in base:
+        p = int(p)
+        if p * p >= hi:
+            break
+        start = max(p * p, (lo + p - 1) // p * p)
+        segment[start - lo::p] = False
+    return np.flatnonzero(segment).astype(np.int64) + lo
+
+def create_segments(lo, hi, segment_size):
+    return [(from_i, min(from_i + segment_size, hi)) for from_i in range(lo, hi, segment_size)]
+
+def iter_primes_in_range(lo, hi, num_workers=None, segment_size=SEGMENT_SIZE):
+    '''
+    Yield the primes in [lo, hi) one segment at a time, in order. The base primes up to sqrt(hi)
+    are computed once here and the segments are sieved on the persistent worker pool.
+    '''
+    base = base_primes(math.isqrt(max(hi - 1, 0)))
+    tasks = [(from_i, to_i, base) for from_i, to_i in create_segments(lo, hi, segment_size)]
+    if num_workers == 1:
+        yield from map(sieve_segment, tasks)
+    else:
+        yield from get_pool(num_workers).imap(sieve_segment, tasks)
+
+def primes_in_range(lo, hi, num_workers=None, segment_size=SEGMENT_SIZE):
+    """All primes in [lo, hi) as one sorted int64 array"""
+    segments = list(iter_primes_in_range(lo, hi, num_workers, segment_size))
+    return np.concatenate(segments) if segments else np.empty(0, dtype=np.int64)
+
+if __name__ == '__main__':
+    from prime_search_queues import search_primes
+
+    num_of_workers = 4
+    number_range = range(100_000_000, 101_000_000)
+
+    t1 = time.time()
+    primes = primes_in_range(number_range.start, number_range.stop, num_of_workers)
+    sieve_seconds = time.time() - t1
+    print(f"Segmented sieve: took {sieve_seconds:0.3f} seconds")
+
+    t1 = time.time()
+    expected = sorted(search_primes(number_range, num_of_workers, batch_size=10_000))
+    queue_seconds = time.time() - t1
+    print(f"Batched queues: took {queue_seconds:0.3f} seconds")
+
+    assert primes.tolist() == expected
+    print(len(primes), primes[:10], primes[-10:], f"{queue_seconds / sieve_seconds:0.0f}x faster")
@@ -0,0 +1,206 @@
+
+import bisect
+import os
+import time
+
+import numpy as np
+
+from prime_sieve import primes_in_range
+
+BLOCK = 1 << 16 # Gaps are computed in whole blocks of this many numbers
+
+class PrimeStore:
+    '''
+    Primes kept on disk in a directory, computed once and looked up from then on.
+
+        primes.bits  - bitset over the odd numbers, bit i is 2 * i + 1, memory mapped. Parts
+                       that were never computed are holes in a sparse file and take no disk space.
+        counts.bin   - int64, entry b is the number of primes below b * BLOCK in covered blocks,
+                       memory mapped. count reads two entries plus the partial blocks at its ends.
+        covered.npy  - sorted, merged [lo, hi) ranges that have been computed
+
+    Queries sieve only the parts of their range that are not covered yet.
+    '''
+
+    def __init__(self, directory, num_workers=None):
+        self.directory = directory
+        self.num_workers = num_workers
+        os.makedirs(directory, exist_ok=True)
+        self.bits_path = os.path.join(directory, 'primes.bits')
+        self.counts_path = os.path.join(directory, 'counts.bin')
+        self.covered_path = os.path.join(directory, 'covered.npy')
+
+        if os.path.exists(self.covered_path):
+            self.covered = [tuple(r) for r in np.load(self.covered_path).tolist()]
+        else:
+            self.covered = []
+        self.bits = None
+        self.open_bits(0)
+
+        self.counts = None
+        rebuild = not os.path.exists(self.counts_path) # Store written before the counts existed
+        self.open_counts(0)
+        if rebuild:
+            for covered_lo, covered_hi in self.covered:
+                self.open_counts(covered_hi // BLOCK)
+                self.set_block_counts(covered_lo, covered_hi, [self.count_bits(block_lo, block_lo + BLOCK)
+                                                               for block_lo in range(covered_lo, covered_hi, BLOCK)])
+
+    def open_bits(self, num_bytes):
+        """Memory map the bitset, growing the file to at least num_bytes first"""
+        if self.bits is not None:
+            self.bits.flush()
+            self.bits = None
+        with open(self.bits_path, 'ab') as f:
+            if os.path.getsize(self.bits_path) < num_bytes:
+                f.truncate(num_bytes) # Sparse, the new bytes are not written
+        size = os.path.getsize(self.bits_path)
+        self.bits = np.memmap(self.bits_path, dtype=np.uint8, mode='r+', shape=(size,)) if size else None
+
+    def open_counts(self, num_blocks):
+        """Memory map the cumulative counts, growing them to cover num_blocks blocks first"""
+        total = 0
+        if self.counts is not None:
+            total = int(self.counts[-1])
+            self.counts.flush()
+            self.counts = None
+        with open(self.counts_path, 'ab') as f:
+            missing = num_blocks + 1 - os.path.getsize(self.counts_path) // 8
+            if missing > 0:
+                f.write(np.full(missing, total, dtype=np.int64).tobytes()) # Nothing new is covered yet
+        self.counts = np.memmap(self.counts_path, dtype=np.int64, mode='r+')
+
+    def set_block_counts(self, lo, hi, block_counts):
+        '''
+        Set the prime counts of the blocks in [lo, hi) and shift every later cumulative count.
+        Counts that were set before are replaced, not added to, so redoing a gap is harmless.
+        '''
+        first, last = lo // BLOCK, hi // BLOCK
+        old = self.counts[first + 1:last + 1] - self.counts[first:last]
+        delta = np.cumsum(np.asarray(block_counts, dtype=np.int64) - old)
+        self.counts[first + 1:last + 1] += delta
+        self.counts[last + 1:] += delta[-1]
+        self.counts.flush()
+
+    def gaps(self, lo, hi):
+        """The parts of [lo, hi) that are not covered yet"""
+        gaps = []
+        i = bisect.bisect_right(self.covered, (lo, float('inf'))) - 1
+        position = lo
+        for covered_lo, covered_hi in self.covered[max(i, 0):]:
+            if covered_lo >= hi:
+                break
+            if covered_lo > position:
+                gaps.append((position, covered_lo))
+            position = max(position, covered_hi)
+        if position < hi:
+            gaps.append((position, hi))
+        return gaps
+
+    def add_covered(self, lo, hi):
+        merged = []
+        for covered_lo, covered_hi in sorted(self.covered + [(lo, hi)]):
+            if merged and covered_lo <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], covered_hi))
+            else:
+                merged.append((covered_lo, covered_hi))
+        self.covered = merged
+
+        # Written under a temporary name first so a crash never leaves a broken index behind
+        tmp_path = self.covered_path + '.tmp.npy'
+        np.save(tmp_path, np.array(self.covered, dtype=np.int64).reshape(-1, 2))
+        os.replace(tmp_path, self.covered_path)
+
+    def ensure(self, lo, hi):
+        """Sieve the uncovered parts of [lo, hi), rounded out to whole blocks, into the store"""
+        lo, hi = lo - lo % BLOCK, -(-hi // BLOCK) * BLOCK
+        gaps = self.gaps(lo, hi)
+        if not gaps:
+            return
+
+        num_bytes = (hi // 2 + 7) // 8
+        if self.bits is None or len(self.bits) < num_bytes:
+            self.open_bits(num_bytes)
+        if len(self.counts) < hi // BLOCK + 1:
+            self.open_counts(hi // BLOCK)
+
+        for gap_lo, gap_hi in gaps:
+            primes = primes_in_range(gap_lo, gap_hi, self.num_workers)
+            idx = (primes[primes > 2] - 1) // 2
+            # Bits of numbers that were never covered are all 0, so setting the primes is enough
+            np.bitwise_or.at(self.bits, idx >> 3, (1 << (idx & 7)).astype(np.uint8))
+            self.bits.flush()
+            self.set_block_counts(gap_lo, gap_hi, np.bincount((primes - gap_lo) // BLOCK,
+                                                              minlength=(gap_hi - gap_lo) // BLOCK))
+            self.add_covered(gap_lo, gap_hi)
+
+    def odd_bits(self, lo, hi):
+        """One bool per odd number in [lo, hi), read from the part of the file holding them"""
+        first, last = lo // 2, hi // 2 # Bit i is 2 * i + 1, so these are exactly the odd numbers in the range
+        if first >= last:
+            return np.zeros(0, dtype=bool)
+        chunk = np.unpackbits(self.bits[first >> 3:(last + 7) >> 3], bitorder='little')
+        offset = first & 7
+        return chunk[offset:offset + last - first].astype(bool)
+
+    def is_prime(self, n):
+        """O(1) once n is covered"""
+        self.ensure(n, n + 1)
+        if n < 3 or n % 2 == 0:
+            return n == 2
+        i = (n - 1) // 2
+        return bool(self.bits[i >> 3] >> (i & 7) & 1)
+
+    def primes_in(self, lo, hi):
+        """The primes in [lo, hi) as an int64 array"""
+        if hi <= lo:
+            return np.empty(0, dtype=np.int64)
+        self.ensure(lo, hi)
+        primes = np.flatnonzero(self.odd_bits(lo, hi)) * 2 + (lo // 2) * 2 + 1
+        if lo <= 2 < hi:
+            primes = np.concatenate([[2], primes])
+        return primes.astype(np.int64)
+
+    def count_bits(self, lo, hi):
+        """Number of primes in the covered range [lo, hi), a popcount over its (hi - lo) / 16 bytes"""
+        return int(np.count_nonzero(self.odd_bits(lo, hi))) + (1 if lo <= 2 < hi else 0)
+
+    def count(self, lo, hi):
+        """Number of primes in [lo, hi), two cumulative counts plus popcounts of at most two partial blocks"""
+        if hi <= lo:
+            return 0
+        self.ensure(lo, hi)
+        first, last = -(-lo // BLOCK), hi // BLOCK # The whole blocks inside the range
+        if first >= last:
+            return self.count_bits(lo, hi)
+        return (int(self.counts[last] - self.counts[first])
+                + self.count_bits(lo, first * BLOCK) + self.count_bits(last * BLOCK, hi))
+
+    def close(self):
+        if self.bits is not None:
+            self.bits.flush()
+            self.bits = None
+        if self.counts is not None:
+            self.counts.flush()
+            self.counts = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+if __name__ == '__main__':
+    from worker_pool import shutdown_pools
+
+    with PrimeStore('prime_store', num_workers=4) as store:
+        for attempt in ('first', 'second'):
+            t1 = time.time()
+            primes = store.primes_in(100_000_000, 101_000_000)
+            print(f"{attempt} query: {len(primes)} primes, took {time.time() - t1:0.4f} seconds")
+
+        t1 = time.time()
+        print(store.count(100_000_000, 101_000_000), store.is_prime(100_000_007), store.is_prime(100_000_009),
+              f"lookups took {time.time() - t1:0.4f} seconds")
+        print('Covered:', store.covered)
+    shutdown_pools()
@@ -0,0 +1,100 @@
+
+import math
+import os
+import queue
+import time
+
+from worker_pool import get_pool, shutdown_pools
+
+def chunk_size(remaining, num_workers, schedule, total, min_chunk):
+    '''
+    Size of the next chunk. static cuts the work into num_workers equal chunks up front, like
+    create_range does. guided hands out a share of what is left, so chunks shrink towards the end
+    and whoever finishes early keeps taking the small ones.
+    '''
+    if schedule == 'static':
+        size = math.ceil(total / num_workers)
+    elif schedule == 'guided':
+        size = math.ceil(remaining / (2 * num_workers))
+    else:
+        raise ValueError(f"Unknown schedule {schedule!r}, expected 'static' or 'guided'")
+    return min(remaining, max(size, min_chunk))
+
+def run_chunk(fn, start, stop, args):
+    """Runs on a pool worker, returns the result with the pid that ran it and how long it took"""
+    st = time.perf_counter()
+    result = fn(start, stop, *args)
+    return start, stop, result, os.getpid(), time.perf_counter() - st
+
+def run_scheduled(fn, total, args=(), num_workers=None, schedule='guided', min_chunk=1):
+    '''
+    Call fn(start, stop, *args) over chunks covering range(total) on the persistent pool of
+    num_workers processes from worker_pool. Returns the (start, stop, result) of every chunk in
+    order and one {worker, busy, idle, chunks} record per worker, idle being the time it was not
+    running fn. fn has to be a module level function.
+
+    Every worker has one chunk at a time and the next one is cut when a chunk comes back, so the
+    chunk sizes follow what is left exactly as with a shared counter. The pool is already up, so
+    idle time is only waiting for chunks, never process start up.
+    '''
+    if num_workers is None:
+        num_workers = os.cpu_count()
+
+    pool = get_pool(num_workers)
+    done = queue.Queue()
+    next_start = 0
+
+    def submit():
+        nonlocal next_start
+        stop = next_start + chunk_size(total - next_start, num_workers, schedule, total, min_chunk)
+        pool.apply_async(run_chunk, (fn, next_start, stop, args), callback=done.put, error_callback=done.put)
+        next_start = stop
+
+    st = time.perf_counter()
+    in_flight = 0
+    while next_start < total and in_flight < num_workers:
+        submit()
+        in_flight += 1
+
+    results = []
+    stats = {}
+    while in_flight:
+        item = done.get()
+        if isinstance(item, BaseException):
+            raise item
+        start, stop, result, pid, busy = item
+        results.append((start, stop, result))
+        record = stats.setdefault(pid, {'worker': len(stats), 'busy': 0.0, 'chunks': 0})
+        record['busy'] += busy
+        record['chunks'] += 1
+        if next_start < total:
+            submit()
+        else:
+            in_flight -= 1
+    wall = time.perf_counter() - st
+
+    # Workers of the pool that never got a chunk were idle all along
+    stats = list(stats.values())
+    stats += [{'worker': worker_id, 'busy': 0.0, 'chunks': 0} for worker_id in range(len(stats), num_workers)]
+    for record in stats:
+        record['idle'] = wall - record['busy']
+    return sorted(results), stats
+
+def print_worker_stats(stats):
+    """Busy and idle time per worker, and the imbalance: the slowest worker over the average one"""
+    print(f"{'worker':>7} {'chunks':>7} {'busy s':>8} {'idle s':>8}")
+    for record in stats:
+        print(f"{record['worker']:>7} {record['chunks']:>7} {record['busy']:>8.3f} {record['idle']:>8.3f}")
+    busy = [record['busy'] for record in stats]
+    print(f'Imbalance (max / mean busy): {max(busy) / (sum(busy) / len(busy)):0.2f}')
+
+if __name__ == '__main__':
+    from prime_search_queues import search_primes_scheduled
+
+    number_range = range(100_000_000, 100_200_000)
+    for schedule in ('static', 'guided'):
+        t1 = time.time()
+        primes, stats = search_primes_scheduled(number_range, 4, schedule)
+        print(f'{schedule}: {len(primes)} primes, took {time.time() - t1:0.2f} seconds')
+        print_worker_stats(stats)
+    shutdown_pools()
@@ -0,0 +1,123 @@
+
+import atexit
+import math
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from verify_prime_flagged import SERIAL_CHECK_CUTOFF, create_range
+
+# One shared 8 byte counter holding the newest cancelled call. Every call gets a new generation
+# and its tasks stop as soon as the counter reaches it, so tasks left over from an earlier call
+# stop as well. Created by the parent on first use, attached to by name in the workers.
+cancel_shm = None
+generation = 0
+attached = {}
+
+def get_cancel_shm():
+    global cancel_shm
+    if cancel_shm is None:
+        cancel_shm = shared_memory.SharedMemory(create=True, size=8)
+        attached[cancel_shm.name] = (cancel_shm, cancel_shm.buf.cast('q'))
+        attached[cancel_shm.name][1][0] = 0
+        atexit.register(release_cancel_shm)
+    return cancel_shm
+
+def release_cancel_shm():
+    global cancel_shm
+    if cancel_shm is not None:
+        _, cancelled = attached.pop(cancel_shm.name)
+        cancelled.release()
+        cancel_shm.close()
+        cancel_shm.unlink()
+        cancel_shm = None
+
+def attach_cancelled(name):
+    """The shared counter as a memoryview of one int64, attached once per worker"""
+    if name not in attached:
+        shm = shared_memory.SharedMemory(name=name)
+        # Attaching registers the segment with the resource tracker as if this worker owned it,
+        # the parent unlinks it
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        attached[name] = (shm, shm.buf.cast('q'))
+    return attached[name][1]
+
+def check_prime_in_range(n_from_i_to_i_cancel):
+    '''
+    False when a divisor of n is in the range, True when there is none and None when the call was
+    cancelled first. Reading the flag is a plain memory read, so it is polled on every iteration.
+    '''
+    (n, (from_i, to_i), (name, call_generation)) = n_from_i_to_i_cancel
+    cancelled = attach_cancelled(name)
+    if n % 2 == 0:
+        return False
+    if (from_i % 2 == 0):
+        from_i = from_i - 1
+
+    for i in range(from_i, int(to_i), 2):
+        if cancelled[0] >= call_generation:
+            return None
+        if n % i == 0:
+            cancelled[0] = call_generation
+            return False
+    return True
+
+def check_prime(n, pool, num_chunks=256):
+    '''
+    Trial division over many small chunks with imap_unordered. The first False answers the call
+    and cancels every chunk still running or waiting, instead of waiting for all of them.
+    '''
+    global generation
+    shm = get_cancel_shm()
+    generation += 1
+    cancel = (shm.name, generation)
+
+    from_i = 3
+    to_i = math.isqrt(n) + 1
+    try:
+        result = check_prime_in_range((n, (from_i, min(to_i, SERIAL_CHECK_CUTOFF)), cancel))
+        if to_i <= SERIAL_CHECK_CUTOFF or result == False:
+            return result
+
+        from_i = SERIAL_CHECK_CUTOFF
+        num_chunks = max(1, min(num_chunks, (to_i - from_i) // 2))
+        ranges_to_check = create_range(from_i, to_i, num_chunks)
+        ranges_to_check = zip(num_chunks*[n], ranges_to_check, num_chunks*[cancel])
+
+        for result in pool.imap_unordered(check_prime_in_range, ranges_to_check):
+            if result == False:
+                return False
+        return True
+    finally:
+        attached[shm.name][1][0] = generation # Stop whatever is left of this call
+
+def time_to_answer_report(test_cases, pool, num_processes=4):
+    """Time to answer of every test case here and in verify_prime_flagged, on the same pool"""
+    import multiprocessing
+    import verify_prime_flagged
+
+    manager = multiprocessing.Manager()
+    flag = manager.Value(b'c', verify_prime_flagged.FLAG_CLEAR)
+
+    print(f"{'n':>20} {'flagged s':>10} {'shared s':>10} {'speedup':>8}")
+    for n in test_cases:
+        st = time.time()
+        expected = verify_prime_flagged.check_prime(n, pool, num_processes, flag)
+        flagged_seconds = time.time() - st
+
+        st = time.time()
+        result = check_prime(n, pool)
+        shared_seconds = time.time() - st
+
+        assert result == expected
+        print(f'{n:>20} {flagged_seconds:>10.3f} {shared_seconds:>10.3f} {flagged_seconds / shared_seconds:>8.1f}')
+
+if __name__ == '__main__':
+    from worker_pool import get_pool, shutdown_pools
+
+    #[non_prime, non_prime, non_prime]
+    test_cases = [112272535095295, 100109100129100369, 100109100129101027]
+
+    num_of_workers = 4
+    pool = get_pool(num_of_workers)
+    time_to_answer_report(test_cases, pool, num_of_workers)
+    shutdown_pools()
@@ -1,9 +1,10 @@
 
 import multiprocessing
-from multiprocessing import Pool
 import time
 import math
 
+from worker_pool import get_pool, shutdown_pools
+
 def create_range(from_i, to_i, num_processes):
 
     n = to_i - from_i
@@ -52,8 +53,9 @@ if __name__ == '__main__':
     primes = []
     manager = multiprocessing.Manager()
     
+    pool = get_pool(num_of_workers) # Started once, reused for every test case
     for n in test_cases:
-        pool = Pool(processes=num_of_workers)
         st = time.time()
         print(f'The Value {n} is a prime: {check_prime(n, pool, num_of_workers)} (Took {time.time() - st} seconds)')
+    shutdown_pools()
         
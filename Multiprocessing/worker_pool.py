@@ -0,0 +1,80 @@
+
+import atexit
+import importlib
+import os
+import time
+from collections import deque
+from multiprocessing import Pool
+
+# Long lived pools, one per (num_workers, preload), created on first use and shut down at exit
+pools = {}
+
+def preload_modules(module_names):
+    """Pool initializer, imports the modules once per worker so the first task does not pay for it"""
+    for name in module_names:
+        importlib.import_module(name)
+
+def noop(x):
+    return x
+
+def get_pool(num_workers=None, preload=('numpy',)):
+    '''
+    A warmed up Pool of num_workers processes that is reused by every later call with the same
+    arguments. Do not close it yourself, call shutdown_pools (also run at exit) instead.
+    '''
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    key = (num_workers, tuple(preload))
+    pool = pools.get(key)
+    if pool is None:
+        pool = Pool(processes=num_workers, initializer=preload_modules, initargs=(tuple(preload),))
+        pool.map(noop, range(num_workers)) # Wait for every worker to be up and initialised
+        pools[key] = pool
+    return pool
+
+def imap_bounded(pool, fn, tasks, max_in_flight):
+    '''
+    pool.imap that keeps at most max_in_flight tasks submitted ahead of the consumer. A consumer that
+    stops early leaves only those to drain on the pool, instead of every remaining task.
+    '''
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(fn, (task,)))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def shutdown_pools():
+    """Let the workers of every pool finish their tasks and exit"""
+    while pools:
+        _, pool = pools.popitem()
+        pool.close()
+        pool.join()
+
+atexit.register(shutdown_pools)
+
+def dispatch_overhead_report(num_runs=10, num_tasks=100, num_workers=4):
+    '''
+    Run num_runs jobs of num_tasks empty tasks, once with a new Pool per job (how the scripts used to
+    do it) and once on the persistent pool, and print the time per job and per task.
+    '''
+    def fresh_pool_job():
+        with Pool(processes=num_workers, initializer=preload_modules, initargs=(('numpy',),)) as pool:
+            pool.map(noop, range(num_tasks))
+
+    def persistent_pool_job():
+        get_pool(num_workers).map(noop, range(num_tasks))
+
+    get_pool(num_workers) # The warm up is paid once, outside of the jobs
+    print(f"{'pool':>12} {'s/job':>9} {'us/task':>9}")
+    for name, job in (('fresh', fresh_pool_job), ('persistent', persistent_pool_job)):
+        start_time = time.perf_counter()
+        for _ in range(num_runs):
+            job()
+        seconds = (time.perf_counter() - start_time) / num_runs
+        print(f'{name:>12} {seconds:>9.4f} {seconds / num_tasks * 1e6:>9.1f}')
+
+if __name__ == '__main__':
+    dispatch_overhead_report()
+    shutdown_pools()
@@ -1,10 +1,17 @@
+# Bumped whenever a kernel signature changes, julia_backends refuses a cythonfn built from an older .pyx
+KERNEL_API = 2
+
 def calculate_juliaset_serial(maxiter, zs, cs):
-    """Calculate output list using Julia update rule"""
+    """Calculate output list using Julia update rule. cs can also be a single complex constant"""
+    const_c = isinstance(cs, complex)
+
     output = [0] * len(zs)
+    c = cs
     for i in range(len(zs)):
         n = 0
         z = zs[i]
-        c = cs[i]
+        if not const_c:
+            c = cs[i]
         while abs(z) < 2 and n < maxiter:
             z = z * z + c
             n += 1
@@ -12,15 +19,20 @@ def calculate_juliaset_serial(maxiter, zs, cs):
     return output
 
 def calculate_juliaset_serial_ctypes(int maxiter, zs, cs):
-    """Calculate output list using Julia update rule"""
+    """Calculate output list using Julia update rule. cs can also be a single complex constant"""
     cdef unsigned int i, n
     cdef double complex z, c
+    cdef bint const_c = isinstance(cs, complex)
+
+    if const_c:
+        c = cs
 
     output = [0] * len(zs)
     for i in range(len(zs)):
         n = 0
         z = zs[i]
-        c = cs[i]
+        if not const_c:
+            c = cs[i]
         while abs(z) < 2 and n < maxiter:
             z = z * z + c
             n += 1
@@ -31,17 +43,25 @@ import numpy as np
 cimport numpy as np
 
 np.import_array()
-def calculate_juliaset_cython_numpy(int maxiter, double complex[:] zs, double complex[:] cs):
-    """Calculate output list using Julia update rule"""
+def calculate_juliaset_cython_numpy(int maxiter, double complex[:] zs, cs):
+    """Calculate output list using Julia update rule. cs can also be a single complex constant"""
 
     cdef unsigned int i, n
     cdef double complex z, c
     cdef int[:] output = np.empty(len(zs), dtype=np.int32) # This will allocate a block of memory without initializing (like C)
+    cdef bint const_c = isinstance(cs, complex)
+    cdef double complex[:] cs_view = None
+
+    if const_c:
+        c = cs
+    else:
+        cs_view = cs
 
     for i in range(len(zs)):
         n = 0
         z = zs[i]
-        c = cs[i]
+        if not const_c:
+            c = cs_view[i]
         while n < maxiter and (z.real * z.real + z.imag * z.imag) < 4:
             z = z * z + c
             n += 1
@@ -52,20 +72,100 @@ from cython.parallel import prange
 import numpy as np
 cimport numpy as np
 
-def calculate_juliaset_cython_openmp(int maxiter, double complex[:] zs, double complex[:] cs):
-    """Calculate output list using Julia update rule"""
+def calculate_juliaset_cython_openmp(int maxiter, double complex[:] zs, cs):
+    """Calculate output list using Julia update rule. cs can also be a single complex constant"""
 
     cdef unsigned int i, length
-    cdef double complex z, c
+    cdef double complex z, c, c_const = 0
     cdef int[:] output = np.empty(len(zs), dtype=np.int32)
+    cdef bint const_c = isinstance(cs, complex)
+    cdef double complex[:] cs_view = None
     length = len(zs)
 
+    if const_c:
+        c_const = cs
+    else:
+        cs_view = cs
+
     with nogil: # To disable python GIL
         for i in prange(length, schedule="guided"):
             z = zs[i]
-            c = cs[i]
+            if const_c:
+                c = c_const
+            else:
+                c = cs_view[i]
             output[i] = 0
             while output[i] < maxiter and (z.real * z.real + z.imag * z.imag) < 4:
                 z = z * z + c
                 output[i] += 1
-    return output
\ No newline at end of file
+    return output
+
+def calculate_juliaset_cython_periodic(int maxiter, double complex[:] zs, cs, double tolerance=1e-12):
+    """
+    Calculate output list using Julia update rule, stopping a pixel as soon as its orbit comes
+    back within tolerance of an earlier point (Brent's cycle detection).
+    Returns the output and the number of iterations that were saved.
+    """
+
+    cdef unsigned int i, length
+    cdef int n, next_save
+    cdef long long iterations_saved = 0
+    cdef double complex z, z_saved, d, c, c_const = 0
+    cdef double tolerance2 = tolerance * tolerance
+    cdef int[:] output = np.empty(len(zs), dtype=np.int32)
+    cdef bint const_c = isinstance(cs, complex)
+    cdef double complex[:] cs_view = None
+    length = len(zs)
+
+    if const_c:
+        c_const = cs
+    else:
+        cs_view = cs
+
+    with nogil:
+        for i in prange(length, schedule="guided"):
+            z = zs[i]
+            if const_c:
+                c = c_const
+            else:
+                c = cs_view[i]
+            n = 0
+            z_saved = z
+            next_save = 1
+            while n < maxiter and (z.real * z.real + z.imag * z.imag) < 4:
+                z = z * z + c
+                n = n + 1
+                d = z - z_saved
+                if (d.real * d.real + d.imag * d.imag) < tolerance2:
+                    iterations_saved += maxiter - n
+                    n = maxiter
+                    break
+                if n == next_save:
+                    z_saved = z
+                    next_save = next_save * 2
+            output[i] = n
+    return output, iterations_saved
+
+cimport cython
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def diffusion_step_cython(double[:, ::1] grid, double[:, ::1] next_grid, double dt, double D=1.0):
+    """
+    One diffusion step with periodic boundaries. Reads grid once and writes next_grid once,
+    rows are spread over the cores. Same operations in the same order as the numpy step.
+    """
+
+    cdef Py_ssize_t i, j, up, down, left, right
+    cdef Py_ssize_t max_y = grid.shape[0], max_x = grid.shape[1]
+    cdef double coefficient = dt * D
+
+    with nogil:
+        for i in prange(max_y, schedule="static"):
+            up = (i - 1 + max_y) % max_y
+            down = (i + 1) % max_y
+            for j in range(max_x):
+                left = j - 1 if j > 0 else max_x - 1
+                right = j + 1 if j < max_x - 1 else 0
+                next_grid[i, j] = (grid[i, j] * -4 + grid[up, j] + grid[down, j]
+                                   + grid[i, left] + grid[i, right]) * coefficient + grid[i, j]
@@ -1,188 +1,35 @@
-import cythonfn
-import time
+import os
+import sys
 
-# area of imaginary space to calculate pixel values
-x1, x2, y1, y2 = -1.8, 1.8, -1.8, 1.8
-c_real, c_img = -0.62772, -.42193
+# The kernels and the grid builder are shared with the pure python scripts. Put scripts first so
+# `juliset` resolves to the reference module over there and not to this file.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from julia_backends import calc_juliaset_time
+from instrumentation import span
 
+def calc_juliaset_time_backend(desired_width, max_iterations, backend, label):
+    """Build the Julia set with a single backend and report how long it took"""
+
+    with span(backend) as timing:
+        output = calc_juliaset_time(desired_width, max_iterations, backend)
+    print(f"{label} ran for {timing['wall']:0.2f} seconds.")
 
-def calculate_juliaset_serial(maxiter, zs, cs):
-    """Calculate output list using Julia update rule"""
-    output = [0] * len(zs)
-    for i in range(len(zs)):
-        n = 0
-        z = zs[i]
-        c = cs[i]
-        while abs(z) < 2 and n < maxiter:
-            z = z * z + c
-            n += 1
-        output[i] = n
     return output
 
 def calc_juliaset_time_cython(desired_width, max_iterations):
-    """Create a list of complex coordinates (zs) and complex parameters (cs), to build Julia set"""
-
-    x_step = (x2 - x1) / desired_width
-    y_step = (y1 - y2) / desired_width
-
-    x = []
-    y = []
-
-    ycoord = y2
-    while ycoord > y1:
-        y.append(ycoord)
-        ycoord += y_step
-    
-    xcoord = x1
-    while xcoord < x2:
-        x.append(xcoord)
-        xcoord += x_step
-
-    zs = []
-    cs = []
-    for ycoord in y:
-        for xcoord in x:
-            zs.append(complex(xcoord, ycoord))
-            cs.append(complex(c_real, c_img))
-    
-    st = time.time()
-    output = cythonfn.calculate_juliaset_serial(max_iterations, zs, cs)
-    et = time.time()
-    print(f'Cython compiled code ran for {et-st:0.2f} seconds.')
-
-    return output
+    return calc_juliaset_time_backend(desired_width, max_iterations, 'cython', 'Cython compiled code')
 
 def calc_juliaset_time_regular(desired_width, max_iterations):
-    """Create a list of complex coordinates (zs) and complex parameters (cs), to build Julia set"""
-
-    x_step = (x2 - x1) / desired_width
-    y_step = (y1 - y2) / desired_width
-
-    x = []
-    y = []
-
-    ycoord = y2
-    while ycoord > y1:
-        y.append(ycoord)
-        ycoord += y_step
-    
-    xcoord = x1
-    while xcoord < x2:
-        x.append(xcoord)
-        xcoord += x_step
-
-    zs = []
-    cs = []
-    for ycoord in y:
-        for xcoord in x:
-            zs.append(complex(xcoord, ycoord))
-            cs.append(complex(c_real, c_img))
-    
-    st = time.time()
-    output = calculate_juliaset_serial(max_iterations, zs, cs)
-    et = time.time()
-    print(f'Regular python code ran for {et-st:0.2f} seconds.')
-
-    return output
+    return calc_juliaset_time_backend(desired_width, max_iterations, 'python', 'Regular python code')
 
 def calc_juliaset_time_cython_ctypes(desired_width, max_iterations):
-    """Create a list of complex coordinates (zs) and complex parameters (cs), to build Julia set"""
-
-    x_step = (x2 - x1) / desired_width
-    y_step = (y1 - y2) / desired_width
-
-    x = []
-    y = []
-
-    ycoord = y2
-    while ycoord > y1:
-        y.append(ycoord)
-        ycoord += y_step
-    
-    xcoord = x1
-    while xcoord < x2:
-        x.append(xcoord)
-        xcoord += x_step
-
-    zs = []
-    cs = []
-    for ycoord in y:
-        for xcoord in x:
-            zs.append(complex(xcoord, ycoord))
-            cs.append(complex(c_real, c_img))
-    
-    st = time.time()
-    output = cythonfn.calculate_juliaset_serial_ctypes(max_iterations, zs, cs)
-    et = time.time()
-    print(f'Cython ctype annotated compiled code ran for {et-st:0.2f} seconds.')
-
-    return output
+    return calc_juliaset_time_backend(desired_width, max_iterations, 'cython_ctypes', 'Cython ctype annotated compiled code')
 
 def calc_juliaset_time_cython_numpy(desired_width, max_iterations):
-    """Create a list of complex coordinates (zs) and complex parameters (cs), to build Julia set"""
-
-    x_step = (x2 - x1) / desired_width
-    y_step = (y1 - y2) / desired_width
-
-    x = []
-    y = []
-
-    ycoord = y2
-    while ycoord > y1:
-        y.append(ycoord)
-        ycoord += y_step
-    
-    xcoord = x1
-    while xcoord < x2:
-        x.append(xcoord)
-        xcoord += x_step
-
-    zs = []
-    cs = []
-    for ycoord in y:
-        for xcoord in x:
-            zs.append(complex(xcoord, ycoord))
-            cs.append(complex(c_real, c_img))
-    
-    st = time.time()
-    output = cythonfn.calculate_juliaset_cython_numpy(max_iterations, zs, cs)
-    et = time.time()
-    print(f'Cython numpy annotated compiled code ran for {et-st:0.2f} seconds.')
-
-    return output
+    return calc_juliaset_time_backend(desired_width, max_iterations, 'cython_numpy', 'Cython numpy annotated compiled code')
 
 def calc_juliaset_time_cython_openmp(desired_width, max_iterations):
-    """Create a list of complex coordinates (zs) and complex parameters (cs), to build Julia set"""
-
-    x_step = (x2 - x1) / desired_width
-    y_step = (y1 - y2) / desired_width
-
-    x = []
-    y = []
-
-    ycoord = y2
-    while ycoord > y1:
-        y.append(ycoord)
-        ycoord += y_step
-    
-    xcoord = x1
-    while xcoord < x2:
-        x.append(xcoord)
-        xcoord += x_step
-
-    zs = []
-    cs = []
-    for ycoord in y:
-        for xcoord in x:
-            zs.append(complex(xcoord, ycoord))
-            cs.append(complex(c_real, c_img))
-    
-    st = time.time()
-    output = cythonfn.calculate_juliaset_cython_openmp(max_iterations, zs, cs)
-    et = time.time()
-    print(f'Cython numpy annotated compiled code ran for {et-st:0.2f} seconds.')
-
-    return output
+    return calc_juliaset_time_backend(desired_width, max_iterations, 'cython_openmp', 'Cython OpenMP compiled code')
 
 if __name__== '__main__':
     x = calc_juliaset_time_cython(1000, 300)
@@ -190,6 +37,3 @@ if __name__== '__main__':
     z = calc_juliaset_time_cython_ctypes(1000, 300)
     p = calc_juliaset_time_cython_numpy(1000, 300)
     q = calc_juliaset_time_cython_openmp(1000, 300)
-
-
-
@@ -0,0 +1,217 @@
+import argparse
+import importlib
+import json
+import sys
+import tracemalloc
+
+import numpy as np
+
+# Variant name -> module with the run_experiment of that implementation
+VARIANTS = {
+    'pure_python': 'run_experiment',
+    'segmented': 'run_experiment_segmented',
+    'flat_array': 'run_experiment_flat_array',
+    'vectorized': 'run_experiment_vectorized',
+    'mem_optimized': 'run_experiment_mem_optimized',
+    'further_mem_optimized': 'run_experiment_further_mem_optimized',
+    'numexpr_optimized': 'run_experiment_numexpr_optimized',
+    'temporal_blocking': 'run_experiment_temporal',
+    'stencil': 'stencil',
+    'compiled': 'run_experiment_compiled',
+}
+REFERENCE_VARIANT = 'vectorized'
+
+# Estimated bytes moved to and from main memory per cell update, counting 8 bytes for every
+# float64 array read or written by each numpy pass and assuming no pass finds the grid in cache.
+# e.g. further_mem_optimized: copyto 16, *= -4 16, 4 shifted adds 4 * 24, *= dt * D 16, += grid 24
+DRAM_BYTES_PER_CELL_UPDATE = {
+    'vectorized': 216,
+    'mem_optimized': 232,
+    'further_mem_optimized': 168,
+    'numexpr_optimized': 152,
+    'stencil': 168,
+}
+
+# Variants whose run_experiment takes a dtype for the grids
+DTYPE_VARIANTS = ['vectorized', 'mem_optimized', 'further_mem_optimized', 'numexpr_optimized', 'stencil']
+
+def estimated_bytes_per_cell_update(name, grid_shape):
+    """Bytes moved per cell update of a variant, None for the pure python ones"""
+    if name == 'temporal_blocking':
+        from run_experiment_temporal import bytes_per_cell_update
+        return bytes_per_cell_update(grid_shape)
+    if name == 'compiled':
+        # One read of grid and one write of next_grid, unless it fell back to the numpy step
+        from run_experiment_compiled import default_kernel
+        return 16 if default_kernel() != 'numpy' else DRAM_BYTES_PER_CELL_UPDATE['further_mem_optimized']
+    return DRAM_BYTES_PER_CELL_UPDATE.get(name)
+
+def load_variants(names=None):
+    """Import the run_experiment of every variant, skipping the ones whose dependencies are missing"""
+    loaded = {}
+    for name in (names or VARIANTS):
+        try:
+            loaded[name] = importlib.import_module(VARIANTS[name]).run_experiment
+        except ImportError as e:
+            print(f'Skipping {name}: {e}', file=sys.stderr)
+    return loaded
+
+def measure_peak_memory(run_experiment, num_iterations, grid_shape):
+    """Peak bytes allocated during a short run. Traced separately so the timings are not slowed down"""
+    # An untraced run first, so lazy imports and JIT compilation of the variant are not counted
+    run_experiment(0, grid_shape)
+    tracemalloc.start()
+    try:
+        run_experiment(min(num_iterations, 2), grid_shape)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def benchmark_variants(sizes, iterations, variants=None, reference=REFERENCE_VARIANT, repeats=1):
+    """
+    Run every variant over the sizes x iterations matrix of square grids.
+    Returns one record per (variant, size, iterations) with the time per cell update, the estimated
+    memory traffic per cell update, the peak memory and the largest absolute difference of the
+    final grid against the reference variant.
+    """
+    runs = load_variants(variants)
+    reference_run = load_variants([reference])[reference]
+
+    records = []
+    for size in sizes:
+        grid_shape = (size, size)
+        for num_iterations in iterations:
+            _, expected = reference_run(num_iterations, grid_shape, return_grid=True)
+            for name, run_experiment in runs.items():
+                best = None
+                for _ in range(repeats):
+                    seconds, grid = run_experiment(num_iterations, grid_shape, return_grid=True)
+                    best = seconds if best is None else min(best, seconds)
+
+                records.append({
+                    'variant': name,
+                    'size': size,
+                    'iterations': num_iterations,
+                    'seconds': best,
+                    'seconds_per_cell_update': best / (num_iterations * size * size),
+                    'bytes_per_cell_update': estimated_bytes_per_cell_update(name, grid_shape),
+                    'peak_memory': measure_peak_memory(run_experiment, num_iterations, grid_shape),
+                    'max_abs_diff': float(np.abs(np.asarray(grid) - expected).max()),
+                })
+    return records
+
+def dtype_report(sizes, iterations, variants=None, dtypes=('float32',), repeats=1):
+    """
+    Run every variant in every dtype and compare it against a float64 run of the same variant.
+    Returns one record per (variant, dtype, size, iterations) with the speedup over float64, the
+    largest absolute and relative error of the final grid and the dtype the grid came back in.
+    """
+    runs = load_variants([name for name in (variants or DTYPE_VARIANTS) if name in DTYPE_VARIANTS])
+
+    def best_of(run_experiment, num_iterations, grid_shape, dtype):
+        best = None
+        for _ in range(repeats):
+            seconds, grid = run_experiment(num_iterations, grid_shape, return_grid=True, dtype=dtype)
+            best = seconds if best is None else min(best, seconds)
+        return best, grid
+
+    records = []
+    for name, run_experiment in runs.items():
+        for size in sizes:
+            grid_shape = (size, size)
+            for num_iterations in iterations:
+                reference_seconds, expected = best_of(run_experiment, num_iterations, grid_shape, np.float64)
+                for dtype in dtypes:
+                    seconds, grid = best_of(run_experiment, num_iterations, grid_shape, np.dtype(dtype))
+                    error = np.abs(grid.astype(np.float64) - expected)
+                    records.append({
+                        'variant': name,
+                        'dtype': np.dtype(dtype).name,
+                        'result_dtype': grid.dtype.name,
+                        'size': size,
+                        'iterations': num_iterations,
+                        'seconds': seconds,
+                        'speedup': reference_seconds / seconds,
+                        'max_abs_error': float(error.max()),
+                        'max_rel_error': float(error.max() / np.abs(expected).max()),
+                    })
+    return records
+
+def print_dtype_records(records):
+    print(f"{'variant':>22} {'dtype':>8} {'size':>6} {'iters':>6} {'seconds':>9} {'speedup':>8} "
+          f"{'max abs err':>12} {'max rel err':>12} {'kept dtype':>10}")
+    for r in records:
+        print(f"{r['variant']:>22} {r['dtype']:>8} {r['size']:>6} {r['iterations']:>6} {r['seconds']:>9.3f} "
+              f"{r['speedup']:>8.2f} {r['max_abs_error']:>12.2e} {r['max_rel_error']:>12.2e} "
+              f"{str(r['result_dtype'] == r['dtype']):>10}")
+
+def record_key(record):
+    return (record['variant'], record['size'], record['iterations'])
+
+def find_regressions(records, baseline, threshold=0.1):
+    """
+    Compare the records against a baseline (records of an earlier run). A record regresses when its
+    time per cell update is more than threshold (relative) slower than in the baseline.
+    """
+    baseline = {record_key(r): r for r in baseline}
+
+    regressions = []
+    for record in records:
+        old = baseline.get(record_key(record))
+        if old is None:
+            continue
+        change = record['seconds_per_cell_update'] / old['seconds_per_cell_update'] - 1
+        if change > threshold:
+            regressions.append((record, old, change))
+    return regressions
+
+def print_records(records, tolerance):
+    print(f"{'variant':>22} {'size':>6} {'iters':>6} {'seconds':>9} {'ns/cell':>9} {'B/cell':>7} {'GB/s':>6} "
+          f"{'peak MB':>8} {'max diff':>10} {'agrees':>6}")
+    for r in records:
+        if r['bytes_per_cell_update'] is None:
+            traffic = f"{'-':>7} {'-':>6}"
+        else:
+            bandwidth = r['bytes_per_cell_update'] / r['seconds_per_cell_update'] / 1e9
+            traffic = f"{r['bytes_per_cell_update']:>7.1f} {bandwidth:>6.1f}"
+        print(f"{r['variant']:>22} {r['size']:>6} {r['iterations']:>6} {r['seconds']:>9.3f} "
+              f"{r['seconds_per_cell_update'] * 1e9:>9.2f} {traffic} {r['peak_memory'] / 2**20:>8.2f} "
+              f"{r['max_abs_diff']:>10.2e} {str(r['max_abs_diff'] <= tolerance):>6}")
+
+if __name__== '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the diffusion implementations against each other')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256])
+    parser.add_argument('--iterations', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=None)
+    parser.add_argument('--reference', choices=list(VARIANTS), default=REFERENCE_VARIANT)
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--tolerance', type=float, default=1e-12, help='largest absolute difference that still agrees')
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown that counts as a regression')
+    parser.add_argument('--save-baseline', help='write the records of this run to a baseline JSON')
+    parser.add_argument('--dtypes', nargs='+', help='instead compare the dtype capable variants in these dtypes against float64')
+    args = parser.parse_args()
+
+    if args.dtypes:
+        dtype_records = dtype_report(args.sizes, args.iterations, args.variants, args.dtypes, args.repeats)
+        print_dtype_records(dtype_records)
+        sys.exit(0 if all(r['result_dtype'] == r['dtype'] for r in dtype_records) else 1)
+
+    records = benchmark_variants(args.sizes, args.iterations, args.variants, args.reference, args.repeats)
+    print_records(records, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(records, f, indent=2)
+
+    failed = any(r['max_abs_diff'] > args.tolerance for r in records)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(records, json.load(f), args.threshold)
+        for record, old, change in regressions:
+            print(f"REGRESSION {record['variant']} size {record['size']} iterations {record['iterations']}: "
+                  f"{old['seconds_per_cell_update'] * 1e9:0.2f} -> {record['seconds_per_cell_update'] * 1e9:0.2f} ns/cell ({change:+.0%})")
+        failed = failed or bool(regressions)
+
+    sys.exit(1 if failed else 0)
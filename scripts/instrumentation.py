@@ -0,0 +1,98 @@
+'''
+Shared timing helpers for the scripts in this project.
+
+    span(name)   - context manager timing a block, spans can be nested
+    timefn       - decorator timing every call of a function in a span
+    profile      - no-op decorator, unless the script runs under kernprof (line_profiler)
+                   or memory_profiler which put their own profile into builtins
+
+Every finished span becomes a record {name, path, wall, cpu, peak_rss, pid}. The newest
+MAX_RECORDS records are kept in `records` and, when an output is set (set_output or the
+INSTRUMENT_OUTPUT environment variable, '-' meaning stderr), every record is written to it as
+one JSON object per line.
+'''
+
+import builtins
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+MAX_RECORDS = 10_000
+
+# Bounded so that a timefn on a hot function or a long job does not grow it forever
+records = deque(maxlen=MAX_RECORDS)
+output = None
+span_stack = []
+
+def set_output(target):
+    """Send the records to target: a path (appended to), an open file, '-' for stderr or None to stop"""
+    global output
+    if target == '-':
+        target = sys.stderr
+    elif isinstance(target, str):
+        target = open(target, 'a')
+    output = target
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, None where it is not available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def emit(record):
+    records.append(record)
+    if output is not None:
+        output.write(json.dumps(record) + '\n')
+        output.flush()
+
+@contextmanager
+def span(name):
+    """
+    Time the enclosed block with the monotonic wall clock and the process CPU clock.
+    Yields the record, which has its wall and cpu times filled in once the block exits.
+    """
+    span_stack.append(name)
+    record = {'name': name, 'path': '/'.join(span_stack), 'wall': None, 'cpu': None,
+              'peak_rss': None, 'pid': os.getpid()}
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall'] = time.perf_counter() - wall_start
+        record['cpu'] = time.process_time() - cpu_start
+        record['peak_rss'] = peak_rss()
+        span_stack.pop()
+        emit(record)
+
+def timefn(fn):
+    """Time every call of fn in its own span"""
+
+    @wraps(fn)
+    def measure_time(*args, **kwargs):
+        with span(fn.__qualname__):
+            return fn(*args, **kwargs)
+
+    return measure_time
+
+def profile(fn):
+    """Hand fn over to line_profiler / memory_profiler when one of them is running, else leave it alone"""
+    injected = builtins.__dict__.get('profile')
+    if injected is not None and injected is not profile:
+        return injected(fn)
+    return fn
+
+if os.environ.get('INSTRUMENT_OUTPUT'):
+    set_output(os.environ['INSTRUMENT_OUTPUT'])
@@ -0,0 +1,155 @@
+import os
+import sys
+
+import numpy as np
+
+from julia_grid import build_zs, c_real, c_img
+
+# cythonfn is built in place by `python setup.py build_ext --inplace` in the compiling related folder
+CYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'compiling related')
+
+# Every loader returns a kernel taking (maxiter, zs, c), where zs is a complex128 array and c a
+# complex scalar, or raises ImportError when the backend is not installed.
+
+def load_python():
+    from juliset import calculate_juliaset_serial
+    return calculate_juliaset_serial
+
+def load_numpy():
+    from juliset_numpy import calculate_juliaset_numpy
+    return calculate_juliaset_numpy
+
+def load_numba():
+    from juliset_numba import calculate_juliaset
+    return calculate_juliaset
+
+def load_numba_parallel():
+    from juliset_numba import calculate_juliaset_parallel
+    return calculate_juliaset_parallel
+
+# KERNEL_API of the cythonfn.pyx these loaders are written against
+CYTHON_KERNEL_API = 2
+
+def import_cythonfn():
+    if CYTHON_DIR not in sys.path:
+        sys.path.append(CYTHON_DIR)
+    import cythonfn
+    if getattr(cythonfn, 'KERNEL_API', 1) < CYTHON_KERNEL_API:
+        # A stale build would load and then fail on the scalar c at call time
+        raise ImportError(f'{cythonfn.__file__} was built from an older cythonfn.pyx, rebuild it with setup.py')
+    return cythonfn
+
+def cython_kernel(name):
+    """A kernel of cythonfn, ImportError when the build does not have it like for a missing module"""
+    kernel = getattr(import_cythonfn(), name, None)
+    if kernel is None:
+        raise ImportError(f'cythonfn has no {name}, rebuild it with setup.py')
+    return kernel
+
+def load_cython():
+    calculate_juliaset_serial = cython_kernel('calculate_juliaset_serial')
+    def calculate_juliaset_cython(maxiter, zs, c):
+        return calculate_juliaset_serial(maxiter, zs.tolist(), c)
+    return calculate_juliaset_cython
+
+def load_cython_ctypes():
+    return cython_kernel('calculate_juliaset_serial_ctypes')
+
+def load_cython_numpy():
+    return cython_kernel('calculate_juliaset_cython_numpy')
+
+def load_cython_openmp():
+    return cython_kernel('calculate_juliaset_cython_openmp')
+
+def load_python_periodic():
+    from juliset import calculate_juliaset_serial_periodic
+    return calculate_juliaset_serial_periodic
+
+def load_numba_periodic():
+    from juliset_numba import calculate_juliaset_periodic
+    return calculate_juliaset_periodic
+
+def load_cython_periodic():
+    return cython_kernel('calculate_juliaset_cython_periodic')
+
+# Fastest first, auto selection picks the first one that loads
+BACKENDS = {
+    'cython_openmp': load_cython_openmp,
+    'numba_parallel': load_numba_parallel,
+    'numba': load_numba,
+    'cython_numpy': load_cython_numpy,
+    'numpy': load_numpy,
+    'cython_ctypes': load_cython_ctypes,
+    'cython': load_cython,
+    'python': load_python,
+}
+REFERENCE_BACKEND = 'python'
+
+# Kernels with periodicity checking take (maxiter, zs, c, tolerance) and return the counts
+# together with the number of iterations the cycle detection saved
+CYCLE_BACKENDS = {
+    'cython_openmp': load_cython_periodic,
+    'numba_parallel': load_numba_periodic,
+    'python': load_python_periodic,
+}
+CYCLE_TOLERANCE = 1e-12
+
+loaded_kernels = {}
+
+def get_kernel(backend=None, detect_cycles=False):
+    """Return the kernel of the given backend, or of the fastest available one when backend is None"""
+    backends = CYCLE_BACKENDS if detect_cycles else BACKENDS
+    if backend is None:
+        backend = DEFAULT_CYCLE_BACKEND if detect_cycles else DEFAULT_BACKEND
+    if backend not in backends:
+        raise ValueError(f'Unknown Julia backend {backend!r}, expected one of {list(backends)}')
+    if (backend, detect_cycles) not in loaded_kernels:
+        loaded_kernels[backend, detect_cycles] = backends[backend]()
+    return loaded_kernels[backend, detect_cycles]
+
+def available_backends(detect_cycles=False):
+    """Names of the backends that can be loaded on this host, fastest first"""
+    available = []
+    for backend in (CYCLE_BACKENDS if detect_cycles else BACKENDS):
+        try:
+            get_kernel(backend, detect_cycles)
+        except ImportError:
+            continue
+        available.append(backend)
+    return available
+
+def calculate_juliaset(maxiter, zs, c, backend=None):
+    """Calculate the iteration counts of zs with the chosen backend, as an int32 array"""
+    kernel = get_kernel(backend)
+    return np.asarray(kernel(maxiter, zs, c), dtype=np.int32)
+
+def calculate_juliaset_cycles(maxiter, zs, c, backend=None, tolerance=CYCLE_TOLERANCE):
+    """
+    Calculate the iteration counts of zs with periodicity checking: a pixel whose orbit comes back
+    within tolerance of an earlier point stops early with maxiter. Pixels that escape keep their counts.
+    Returns the counts as an int32 array and the number of iterations saved.
+    """
+    kernel = get_kernel(backend, detect_cycles=True)
+    output, iterations_saved = kernel(maxiter, zs, c, tolerance)
+    return np.asarray(output, dtype=np.int32), int(iterations_saved)
+
+def calc_juliaset_time(desired_width, max_iterations, backend=None, detect_cycles=False):
+    """Build the Julia set with the chosen backend (or the fastest available one)"""
+    zs = build_zs(desired_width)
+    c = complex(c_real, c_img)
+    if not detect_cycles:
+        return calculate_juliaset(max_iterations, zs, c, backend)
+
+    output, iterations_saved = calculate_juliaset_cycles(max_iterations, zs, c, backend)
+    total_iterations = int(output.sum(dtype=np.int64))
+    print(f'Cycle detection saved {iterations_saved:,} of {total_iterations:,} iterations '
+          f'({100 * iterations_saved / max(total_iterations, 1):0.1f}%)')
+    return output
+
+DEFAULT_BACKEND = available_backends()[0]
+DEFAULT_CYCLE_BACKEND = available_backends(detect_cycles=True)[0]
+
+if __name__== '__main__':
+    print('Available backends:', ', '.join(available_backends()))
+    print('Default backend:', DEFAULT_BACKEND)
+    print('Backends with cycle detection:', ', '.join(available_backends(detect_cycles=True)))
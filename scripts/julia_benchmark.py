@@ -0,0 +1,70 @@
+import argparse
+import time
+
+import numpy as np
+
+from julia_backends import available_backends, calculate_juliaset, calculate_juliaset_cycles, REFERENCE_BACKEND
+from julia_grid import build_zs, c_real, c_img
+
+def benchmark_backends(widths, maxiters, backends=None, reference=REFERENCE_BACKEND, repeats=1, detect_cycles=False):
+    """
+    Run every backend over the widths x maxiters matrix.
+    Returns one record per (backend, width, maxiter) with the pixels/sec and the number
+    of pixels that differ from the reference backend. With detect_cycles the backends run with
+    periodicity checking (against the plain reference) and the iterations saved are recorded too.
+    """
+    if backends is None:
+        backends = available_backends(detect_cycles)
+    c = complex(c_real, c_img)
+
+    records = []
+    for width in widths:
+        zs = build_zs(width)
+        for maxiter in maxiters:
+            expected = calculate_juliaset(maxiter, zs, c, reference)
+            for backend in backends:
+                # Warm up run so JIT compilation and lazy imports are not timed
+                run_backend(maxiter, zs[:width], c, backend, detect_cycles)
+
+                best = None
+                for _ in range(repeats):
+                    st = time.perf_counter()
+                    output, iterations_saved = run_backend(maxiter, zs, c, backend, detect_cycles)
+                    elapsed = time.perf_counter() - st
+                    best = elapsed if best is None else min(best, elapsed)
+
+                records.append({
+                    'backend': backend,
+                    'width': width,
+                    'maxiter': maxiter,
+                    'seconds': best,
+                    'pixels_per_sec': len(zs) / best,
+                    'mismatched_pixels': int(np.count_nonzero(output != expected)),
+                    'max_abs_diff': int(np.abs(output - expected).max()),
+                    'iterations_saved': iterations_saved,
+                })
+    return records
+
+def run_backend(maxiter, zs, c, backend, detect_cycles):
+    if detect_cycles:
+        return calculate_juliaset_cycles(maxiter, zs, c, backend)
+    return calculate_juliaset(maxiter, zs, c, backend), 0
+
+def print_records(records):
+    print(f"{'backend':>15} {'width':>6} {'maxiter':>8} {'seconds':>9} {'Mpixels/s':>10} {'mismatched':>11} {'max diff':>9} {'saved iters':>12}")
+    for r in records:
+        print(f"{r['backend']:>15} {r['width']:>6} {r['maxiter']:>8} {r['seconds']:>9.3f} "
+              f"{r['pixels_per_sec'] / 1e6:>10.3f} {r['mismatched_pixels']:>11} {r['max_abs_diff']:>9} {r['iterations_saved']:>12}")
+
+if __name__== '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark every installed Julia set backend')
+    parser.add_argument('--widths', type=int, nargs='+', default=[250, 500, 1000])
+    parser.add_argument('--maxiters', type=int, nargs='+', default=[100, 300])
+    parser.add_argument('--backends', nargs='+', default=None)
+    parser.add_argument('--reference', default=REFERENCE_BACKEND)
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--detect-cycles', action='store_true', help='run the kernels with periodicity checking')
+    args = parser.parse_args()
+
+    print_records(benchmark_backends(args.widths, args.maxiters, args.backends, args.reference, args.repeats,
+                                     args.detect_cycles))
@@ -0,0 +1,41 @@
+# area of imaginary space to calculate pixel values
+x1, x2, y1, y2 = -1.8, 1.8, -1.8, 1.8
+c_real, c_img = -0.62772, -.42193
+
+def calc_coordinates(desired_width):
+    """
+    Create the x (real) and y (imaginary) axis coordinates of the Julia set plane.
+
+    Every coordinate is computed from its index instead of accumulating the step,
+    so there are always exactly desired_width values on each axis.
+    """
+    x_step = (x2 - x1) / desired_width
+    y_step = (y1 - y2) / desired_width
+
+    x = [x1 + i * x_step for i in range(desired_width)]
+    y = [y2 + i * y_step for i in range(desired_width)]
+
+    return x, y
+
+def build_zs(desired_width):
+    """Create the complex coordinates (zs) as one contiguous, row major complex128 array"""
+    return build_zs_rows(desired_width, 0, desired_width)
+
+def build_zs_rows(desired_width, row_from, row_to):
+    """Create the complex coordinates (zs) of the rows [row_from, row_to) only, as a complex128 array"""
+    import numpy as np
+
+    x_step = (x2 - x1) / desired_width
+    y_step = (y1 - y2) / desired_width
+
+    zs = np.empty((row_to - row_from, desired_width), dtype=np.complex128)
+    zs.real = (x1 + np.arange(desired_width) * x_step)[np.newaxis, :]
+    zs.imag = (y2 + np.arange(row_from, row_to) * y_step)[:, np.newaxis]
+    return zs.ravel()
+
+def iter_zs_rows(desired_width):
+    """Lazily yield the complex coordinates (zs) one row at a time, as plain lists"""
+
+    x, y = calc_coordinates(desired_width)
+    for ycoord in y:
+        yield [complex(xcoord, ycoord) for xcoord in x]
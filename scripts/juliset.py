@@ -1,53 +1,71 @@
-# area of imaginary space to calculate pixel values
-x1, x2, y1, y2 = -1.8, 1.8, -1.8, 1.8
-c_real, c_img = -0.62772, -.42193
+from julia_grid import c_real, c_img, iter_zs_rows
 
 def calculate_juliaset_serial(maxiter, zs, cs):
-    """Calculate output list using Julia update rule"""
+    """Calculate output list using Julia update rule. cs can also be a single complex constant"""
+    if hasattr(zs, 'tolist'):
+        zs = zs.tolist() # numpy scalars are much slower than complex in this loop
+    const_c = isinstance(cs, complex)
+
     output = [0] * len(zs)
+    c = cs
     for i in range(len(zs)):
         n = 0
         z = zs[i]
-        c = cs[i]
+        if not const_c:
+            c = cs[i]
         while abs(z) < 2 and n < maxiter:
             z = z * z + c
             n += 1
         output[i] = n
     return output
 
+def calculate_juliaset_serial_periodic(maxiter, zs, cs, tolerance=1e-12):
+    """
+    Calculate output list using Julia update rule, but stop iterating a pixel as soon as its
+    orbit comes back within tolerance of an earlier point (Brent's cycle detection). Such an
+    orbit is periodic and never escapes, so the pixel gets maxiter straight away.
+    Returns the output list and the number of iterations that were saved.
+    """
+    if hasattr(zs, 'tolist'):
+        zs = zs.tolist()
+    const_c = isinstance(cs, complex)
+
+    output = [0] * len(zs)
+    iterations_saved = 0
+    c = cs
+    for i in range(len(zs)):
+        n = 0
+        z = zs[i]
+        if not const_c:
+            c = cs[i]
+        z_saved = z
+        next_save = 1 # z_saved moves forward at every power of two
+        while abs(z) < 2 and n < maxiter:
+            z = z * z + c
+            n += 1
+            if abs(z - z_saved) < tolerance:
+                iterations_saved += maxiter - n
+                n = maxiter
+                break
+            if n == next_save:
+                z_saved = z
+                next_save *= 2
+        output[i] = n
+    return output, iterations_saved
+
 def calc_juliaset_time(desired_width, max_iterations):
-    """Create a list of complex coordinates (zs) and complex parameters (cs), to build Julia set"""
-
-    x_step = (x2 - x1) / desired_width
-    y_step = (y1 - y2) / desired_width
-
-    x = []
-    y = []
-
-    ycoord = y2
-    while ycoord > y1:
-        y.append(ycoord)
-        ycoord += y_step
-    
-    xcoord = x1
-    while xcoord < x2:
-        x.append(xcoord)
-        xcoord += x_step
-
-    zs = []
-    cs = []
-    for ycoord in y:
-        for xcoord in x:
-            zs.append(complex(xcoord, ycoord))
-            cs.append(complex(c_real, c_img))
-    
-    print("Length of x:", len(x))
-    print("Total elements:", len(zs))
-
-    output = calculate_juliaset_serial(max_iterations, zs, cs)
+    """Build the Julia set row by row, without materializing every complex coordinate at once"""
+
+    c = complex(c_real, c_img)
+
+    output = []
+    for zs in iter_zs_rows(desired_width):
+        output.extend(calculate_juliaset_serial(max_iterations, zs, c))
+
+    print("Length of x:", desired_width)
+    print("Total elements:", len(output))
 
     return output
 
 if __name__== '__main__':
     x = calc_juliaset_time(1000, 300)
-
@@ -0,0 +1,71 @@
+import time
+import numpy as np
+from numba import njit, prange
+
+from julia_grid import build_zs, c_real, c_img
+
+@njit
+def calculate_juliaset(maxiter, zs, c):
+    """Calculate output array using Julia update rule"""
+    output = np.empty(len(zs), dtype=np.int32)
+    for i in range(len(zs)):
+        n = 0
+        z = zs[i]
+        while abs(z) < 2 and n < maxiter:
+            z = z * z + c
+            n += 1
+        output[i] = n
+    return output
+
+@njit(parallel=True)
+def calculate_juliaset_parallel(maxiter, zs, c):
+    """Calculate output array using Julia update rule, with the pixels spread over all the cores"""
+    output = np.empty(len(zs), dtype=np.int32)
+    for i in prange(len(zs)):
+        n = 0
+        z = zs[i]
+        while n < maxiter and (z.real*z.real + z.imag*z.imag) < 4:
+            z = z * z + c
+            n += 1
+        output[i] = n
+    return output
+
+@njit(parallel=True)
+def calculate_juliaset_periodic(maxiter, zs, c, tolerance=1e-12):
+    """
+    Calculate output array using Julia update rule, stopping a pixel as soon as its orbit comes
+    back within tolerance of an earlier point (Brent's cycle detection).
+    Returns the output array and the number of iterations that were saved.
+    """
+    output = np.empty(len(zs), dtype=np.int32)
+    tolerance2 = tolerance * tolerance
+    iterations_saved = 0
+    for i in prange(len(zs)):
+        n = 0
+        z = zs[i]
+        z_saved = z
+        next_save = 1
+        while n < maxiter and (z.real*z.real + z.imag*z.imag) < 4:
+            z = z * z + c
+            n += 1
+            d = z - z_saved
+            if (d.real*d.real + d.imag*d.imag) < tolerance2:
+                iterations_saved += maxiter - n
+                n = maxiter
+                break
+            if n == next_save:
+                z_saved = z
+                next_save *= 2
+        output[i] = n
+    return output, iterations_saved
+
+if __name__== '__main__':
+    zs = build_zs(1000)
+    c = complex(c_real, c_img)
+
+    # First call of each function includes the compilation
+    for fn in (calculate_juliaset, calculate_juliaset_parallel):
+        fn(300, zs[:10], c)
+        st = time.time()
+        fn(300, zs, c)
+        print(f'Numba {fn.__name__} ran for {time.time() - st:0.2f} seconds.')
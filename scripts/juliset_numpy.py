@@ -0,0 +1,81 @@
+import time
+import numpy as np
+
+from julia_grid import build_zs, c_real, c_img
+
+def calculate_juliaset_numpy(maxiter, zs, cs, block_size=20):
+    """
+    Calculate output array using Julia update rule on all of the zs at once.
+
+    After every block_size iterations the pixels that already escaped are dropped from the
+    working arrays, so the late iterations only touch the few points that are still live.
+    Returns the same counts as calculate_juliaset_serial.
+    """
+    z = np.array(zs, dtype=np.complex128)
+    output = np.empty(len(z), dtype=np.int32)
+    idx = np.arange(len(z))
+
+    iterate_live_pixels(maxiter, z, cs, idx, output, 0, block_size)
+    return output
+
+def iterate_live_pixels(maxiter, z, cs, idx, output, n=0, block_size=20):
+    """
+    Continue the Julia update rule for the live pixels z, found at positions idx of output,
+    which have already been through n iterations. z is used as the working array and gets modified.
+
+    The count of every pixel that escapes before maxiter is written to output. The pixels
+    still live at maxiter get maxiter and are returned as (idx, z), so that a later call
+    with a bigger maxiter can carry on from there.
+    """
+    c = np.asarray(cs, dtype=np.complex128)
+    if c.ndim:
+        c = c[idx]
+
+    counts = np.full(len(z), n, dtype=np.int32)
+    live = np.ones(len(z), dtype=bool)
+
+    # Escaped pixels keep iterating until the end of the block and can overflow to inf/nan.
+    # Their counts are already frozen by then, so the warnings are just noise.
+    with np.errstate(over='ignore', invalid='ignore'):
+        while n < maxiter and len(idx):
+            steps = min(block_size, maxiter - n)
+            for _ in range(steps):
+                live &= np.abs(z) < 2
+                counts += live
+                z *= z
+                z += c
+
+            n += steps
+
+            # Compaction of the escaped pixels
+            escaped = ~live
+            output[idx[escaped]] = counts[escaped]
+
+            idx = idx[live]
+            z = z[live]
+            counts = counts[live]
+            if c.ndim:
+                c = c[live]
+            live = np.ones(len(idx), dtype=bool)
+
+    # Whatever is left did not escape (yet)
+    output[idx] = counts
+    return idx, z
+
+def calc_juliaset_time(desired_width, max_iterations):
+    """Build the Julia set from one complex128 array of coordinates (zs) with the numpy kernel"""
+
+    zs = build_zs(desired_width)
+    c = complex(c_real, c_img)
+
+    print("Length of x:", desired_width)
+    print("Total elements:", len(zs))
+
+    st = time.time()
+    output = calculate_juliaset_numpy(max_iterations, zs, c)
+    print(f'Numpy vectorized code ran for {time.time() - st:0.2f} seconds.')
+
+    return output
+
+if __name__== '__main__':
+    x = calc_juliaset_time(1000, 300)
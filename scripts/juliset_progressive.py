@@ -0,0 +1,83 @@
+import time
+import numpy as np
+
+from julia_grid import build_zs, c_real, c_img
+from juliset_numpy import iterate_live_pixels
+
+def render_progressive(desired_width, max_iterations, steps=(8, 4, 2, 1), block_size=20):
+    """
+    Render the Julia set coarse to fine. For every step s in steps, only the pixels on the
+    every s-th row and column which were not calculated by a coarser pass get calculated.
+
+    Yields (s, preview) after each pass, where preview is a full size 2D image in which every
+    pixel not calculated yet takes the value of the nearest calculated one above and left of it.
+    The last preview (step 1) is the exact image.
+    """
+    zs = build_zs(desired_width).reshape(desired_width, desired_width)
+    c = complex(c_real, c_img)
+
+    output = np.zeros((desired_width, desired_width), dtype=np.int32)
+    done = np.zeros((desired_width, desired_width), dtype=bool)
+    flat_output = output.reshape(-1)
+
+    for step in steps:
+        todo = np.zeros_like(done)
+        todo[::step, ::step] = True
+        todo &= ~done
+
+        idx = np.flatnonzero(todo)
+        iterate_live_pixels(max_iterations, zs.reshape(-1)[idx], c, idx, flat_output, 0, block_size)
+        done |= todo
+
+        preview = np.repeat(np.repeat(output[::step, ::step], step, axis=0), step, axis=1)
+        yield step, preview[:desired_width, :desired_width]
+
+def calc_juliaset_state(desired_width, max_iterations, block_size=20):
+    """
+    Build the Julia set and keep what is needed to raise max_iterations later:
+    the counts plus the index and z value of every pixel that has not escaped yet.
+    """
+    zs = build_zs(desired_width)
+    c = complex(c_real, c_img)
+
+    output = np.empty(len(zs), dtype=np.int32)
+    idx, z = iterate_live_pixels(max_iterations, zs.copy(), c, np.arange(len(zs)), output, 0, block_size)
+
+    return {'counts': output, 'idx': idx, 'z': z, 'c': c, 'max_iterations': max_iterations}
+
+def resume_juliaset_state(state, max_iterations, block_size=20):
+    """
+    Raise the max_iterations of a saved state. Only the pixels which had not escaped yet are
+    iterated, starting from their saved z. The counts are the same as a fresh run with the new
+    max_iterations. Returns a new state, the given one is left untouched.
+    """
+    if max_iterations < state['max_iterations']:
+        raise ValueError(f"Can not lower max_iterations from {state['max_iterations']} to {max_iterations}")
+
+    output = state['counts'].copy()
+    idx, z = iterate_live_pixels(max_iterations, state['z'].copy(), state['c'], state['idx'],
+                                 output, state['max_iterations'], block_size)
+
+    return {'counts': output, 'idx': idx, 'z': z, 'c': state['c'], 'max_iterations': max_iterations}
+
+def save_state(path, state):
+    """Save a state to a .npz file"""
+    np.savez(path, counts=state['counts'], idx=state['idx'], z=state['z'],
+             c=state['c'], max_iterations=state['max_iterations'])
+
+def load_state(path):
+    """Load a state saved with save_state"""
+    with np.load(path) as data:
+        return {'counts': data['counts'], 'idx': data['idx'], 'z': data['z'],
+                'c': complex(data['c']), 'max_iterations': int(data['max_iterations'])}
+
+if __name__== '__main__':
+    st = time.time()
+    for step, preview in render_progressive(1000, 300):
+        print(f'Step {step} preview ready after {time.time() - st:0.2f} seconds.')
+
+    state = calc_juliaset_state(1000, 300)
+    st = time.time()
+    state = resume_juliaset_state(state, 1000)
+    print(f'Raising max_iterations from 300 to 1000 took {time.time() - st:0.2f} seconds '
+          f'({len(state["idx"])} pixels still live).')
@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+from julia_backends import calculate_juliaset
+from julia_grid import build_zs_rows, c_real, c_img
+
+# The scheduler is shared with the prime and pi drivers in the Multiprocessing folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Multiprocessing'))
+from scheduler import print_worker_stats, run_scheduled
+
+def calculate_rows(row_from, row_to, desired_width, max_iterations, backend):
+    """Iteration counts of the rows [row_from, row_to)"""
+    zs = build_zs_rows(desired_width, row_from, row_to)
+    return calculate_juliaset(max_iterations, zs, complex(c_real, c_img), backend)
+
+def calc_juliaset_scheduled(desired_width, max_iterations, num_workers=None, schedule='guided', backend='numpy'):
+    '''
+    Build the Julia set with the rows handed out by the scheduler. The cost of a row varies a lot
+    (rows through the middle of the set run to max_iterations), which static chunks do not absorb.
+    Returns the counts and the per worker busy/idle records.
+    '''
+    results, stats = run_scheduled(calculate_rows, desired_width, (desired_width, max_iterations, backend),
+                                   num_workers, schedule)
+    return np.concatenate([counts for _, _, counts in results]), stats
+
+if __name__== '__main__':
+    for schedule in ('static', 'guided'):
+        st = time.time()
+        output, stats = calc_juliaset_scheduled(1000, 300, 4, schedule)
+        print(f'{schedule}: took {time.time() - st:0.2f} seconds, total {output.sum()}')
+        print_worker_stats(stats)
@@ -0,0 +1,53 @@
+import time
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from julia_backends import calculate_juliaset
+from julia_grid import build_zs_rows, c_real, c_img
+
+def calc_juliaset_to_file(path, desired_width, max_iterations, band_rows=64, backend=None, dtype=np.uint16):
+    """
+    Build the Julia set one band of rows at a time and write every band into a memory mapped .npy file
+    as soon as it is done. Peak memory is bounded by a single band, not by the image.
+    """
+    if max_iterations > np.iinfo(dtype).max:
+        raise ValueError(f'max_iterations {max_iterations} does not fit into {np.dtype(dtype).name}')
+
+    c = complex(c_real, c_img)
+    output = open_memmap(path, mode='w+', dtype=dtype, shape=(desired_width, desired_width))
+
+    for row_from in range(0, desired_width, band_rows):
+        row_to = min(row_from + band_rows, desired_width)
+        zs = build_zs_rows(desired_width, row_from, row_to)
+        output[row_from:row_to] = calculate_juliaset(max_iterations, zs, c, backend).reshape(row_to - row_from, desired_width)
+        output.flush() # Hand the band over to the OS so dirty pages do not pile up
+
+    del output
+    return path
+
+def iter_bands(path, band_rows=64):
+    """Read an image .npy file back one band of rows at a time, yields (row_from, band)"""
+    image = np.load(path, mmap_mode='r')
+    for row_from in range(0, image.shape[0], band_rows):
+        yield row_from, np.array(image[row_from:row_from + band_rows])
+
+def colour_map_file(path, out_path, max_iterations, band_rows=64):
+    """
+    Map the iteration counts in a .npy file to a uint8 greyscale .npy image, one band at a time.
+    Counts are scaled so that max_iterations becomes 255.
+    """
+    shape = np.load(path, mmap_mode='r').shape
+    out = open_memmap(out_path, mode='w+', dtype=np.uint8, shape=shape)
+
+    for row_from, band in iter_bands(path, band_rows):
+        out[row_from:row_from + len(band)] = band.astype(np.uint32) * 255 // max(max_iterations, 1)
+    out.flush()
+
+    del out
+    return out_path
+
+if __name__== '__main__':
+    st = time.time()
+    calc_juliaset_to_file('julia_counts.npy', 4000, 300)
+    print(f'Streaming 4000x4000 render ran for {time.time() - st:0.2f} seconds.')
+    colour_map_file('julia_counts.npy', 'julia_image.npy', 300)
@@ -0,0 +1,94 @@
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+from julia_grid import calc_coordinates, c_real, c_img
+
+# Per worker state. Set once by init_worker so that each tile task only has to
+# carry its own bounds instead of the coordinate lists.
+worker_shm = None
+worker_output = None
+worker_x = None
+worker_y = None
+worker_maxiter = None
+
+
+def create_tiles(width, height, tile_size):
+    """Split a width x height plane into (y_from, y_to, x_from, x_to) tiles"""
+
+    tiles = []
+    for y_from in range(0, height, tile_size):
+        for x_from in range(0, width, tile_size):
+            tiles.append((y_from, min(y_from + tile_size, height),
+                          x_from, min(x_from + tile_size, width)))
+    return tiles
+
+def init_worker(shm_name, x, y, maxiter):
+    """Attach the worker to the shared output buffer"""
+    global worker_shm, worker_output, worker_x, worker_y, worker_maxiter
+
+    worker_shm = shared_memory.SharedMemory(name=shm_name)
+    worker_output = worker_shm.buf.cast('i')
+    worker_x = x
+    worker_y = y
+    worker_maxiter = maxiter
+
+def calculate_tile(tile):
+    """
+    Calculate a single tile using the Julia update rule and write the iteration counts
+    straight into the shared output buffer. Nothing but the tile bounds goes back to the parent.
+    """
+    (y_from, y_to, x_from, x_to) = tile
+    output = worker_output
+    maxiter = worker_maxiter
+    width = len(worker_x)
+    c = complex(c_real, c_img)
+
+    for row in range(y_from, y_to):
+        ycoord = worker_y[row]
+        offset = row * width
+        for col in range(x_from, x_to):
+            n = 0
+            z = complex(worker_x[col], ycoord)
+            while abs(z) < 2 and n < maxiter:
+                z = z * z + c
+                n += 1
+            output[offset + col] = n
+    return tile
+
+def calc_juliaset_tiled(desired_width, max_iterations, tile_size=64, num_workers=None):
+    """
+    Build the Julia set by splitting the plane into tiles and calculating them on a process pool.
+    Output is the same row major list of iteration counts as calc_juliaset_time.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count()
+
+    x, y = calc_coordinates(desired_width)
+    width, height = len(x), len(y)
+
+    # int32 output buffer, every pixel is written by exactly one tile
+    shm = shared_memory.SharedMemory(create=True, size=width * height * 4)
+    output = shm.buf.cast('i')
+    assert output.itemsize == 4
+    try:
+        tiles = create_tiles(width, height, tile_size)
+        with Pool(processes=num_workers, initializer=init_worker,
+                  initargs=(shm.name, x, y, max_iterations)) as pool:
+            # Tiles near the set boundary cost far more than the ones outside of it,
+            # so hand them out one at a time rather than in equal static chunks.
+            for _ in pool.imap_unordered(calculate_tile, tiles):
+                pass
+
+        result = output.tolist()
+    finally:
+        output.release()
+        shm.close()
+        shm.unlink()
+
+    return result
+
+if __name__== '__main__':
+    st = time.time()
+    x = calc_juliaset_tiled(1000, 300)
+    print(f'Tiled code ran for {time.time() - st:0.2f} seconds.')
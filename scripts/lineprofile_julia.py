@@ -1,22 +1,17 @@
-# area of imaginary space to calculate pixel values
-x1, x2, y1, y2 = -1.8, 1.8, -1.8, 1.8
-c_real, c_img = -0.62772, -.42193
-
-# check for line_profiler or memory_profiler in the local scope, both
-# are injected by their respective tools or they're absent
-# if these tools aren't being used (in which case we need to substitute
-# a dummy @profile decorator)
-if 'line_profiler' not in dir() and 'profile' not in dir():
-    def profile(func):
-        return func
+from instrumentation import profile
+from julia_grid import c_real, c_img, iter_zs_rows
 
 def calculate_juliaset_serial(maxiter, zs, cs):
-    """Calculate output list using Julia update rule"""
+    """Calculate output list using Julia update rule. cs can also be a single complex constant"""
+    const_c = isinstance(cs, complex)
+
     output = [0] * len(zs)
+    c = cs
     for i in range(len(zs)):
         n = 0
         z = zs[i]
-        c = cs[i]
+        if not const_c:
+            c = cs[i]
         while abs(z) < 2 and n < maxiter:
             z = z * z + c
             n += 1
@@ -25,12 +20,16 @@ def calculate_juliaset_serial(maxiter, zs, cs):
 
 @profile
 def calculate_juliaset_serial_expanded(maxiter, zs, cs):
-    """Calculate output list using Julia update rule"""
+    """Calculate output list using Julia update rule. cs can also be a single complex constant"""
+    const_c = isinstance(cs, complex)
+
     output = [0] * len(zs)
+    c = cs
     for i in range(len(zs)):
         n = 0
         z = zs[i]
-        c = cs[i]
+        if not const_c:
+            c = cs[i]
         while True:
             not_yet_escaped = abs(z) < 2
             iterations_left = n < maxiter
@@ -44,35 +43,16 @@ def calculate_juliaset_serial_expanded(maxiter, zs, cs):
 
 
 def calc_juliaset_time(desired_width, max_iterations):
-    """Create a list of complex coordinates (zs) and complex parameters (cs), to build Julia set"""
-
-    x_step = (x2 - x1) / desired_width
-    y_step = (y1 - y2) / desired_width
+    """Build the Julia set row by row, without materializing every complex coordinate at once"""
 
-    x = []
-    y = []
+    c = complex(c_real, c_img)
 
-    ycoord = y2
-    while ycoord > y1:
-        y.append(ycoord)
-        ycoord += y_step
-    
-    xcoord = x1
-    while xcoord < x2:
-        x.append(xcoord)
-        xcoord += x_step
-
-    zs = []
-    cs = []
-    for ycoord in y:
-        for xcoord in x:
-            zs.append(complex(xcoord, ycoord))
-            cs.append(complex(c_real, c_img))
-    
-    print("Length of x:", len(x))
-    print("Total elements:", len(zs))
+    output = []
+    for zs in iter_zs_rows(desired_width):
+        output.extend(calculate_juliaset_serial_expanded(max_iterations, zs, c))
 
-    output = calculate_juliaset_serial_expanded(max_iterations, zs, cs)
+    print("Length of x:", desired_width)
+    print("Total elements:", len(output))
 
     return output
     
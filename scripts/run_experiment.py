@@ -1,12 +1,12 @@
 
-import time
+from instrumentation import profile, span
 
 @profile
 def step(grid, dt, D = 1.0):
 
     max_y, max_x = len(grid), len(grid[0])
 
-    grid_next = [[0.0]*max_x]*max_y
+    grid_next = [[0.0]*max_x for _ in range(max_y)]
 
     for i in range(max_y):
         for j in range(max_x):
@@ -20,12 +20,13 @@ def step(grid, dt, D = 1.0):
 
     return grid_next
 
-def run_experiment(num_iterations, grid_shape):
+def run_experiment(num_iterations, grid_shape, return_grid=False):
 
     # Initial grid
     max_y, max_x = grid_shape
 
-    grid = [[0.0]*max_x]*max_y
+    # One list per row, [[0.0]*max_x]*max_y would make every row the same list
+    grid = [[0.0]*max_x for _ in range(max_y)]
 
     # Simulating a drop of dye in the middle of our simulated region
     block_low = int(grid_shape[0] * 0.4)
@@ -36,11 +37,13 @@ def run_experiment(num_iterations, grid_shape):
             grid[i][j] = 0.005
 
     # Running the experiment
-    st = time.time()
-    for _ in range(num_iterations):
-        grid = step(grid, 0.1)
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            grid = step(grid, 0.1)
 
-    return time.time() - st
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
 
 if __name__== '__main__':
     run_experiment(150, (640, 640))
@@ -0,0 +1,179 @@
+
+import os
+import queue
+import re
+import threading
+
+import numpy as np
+from numpy import copyto, zeros
+from numpy.lib.format import open_memmap
+
+from instrumentation import records, span
+from run_experiment_further_mem_optimized import step
+
+CHECKPOINT_PATTERN = re.compile(r'checkpoint_(\d+)\.npy$')
+
+def save_checkpoint(directory, grid, iteration, keep=2):
+    '''
+    Write grid into directory/checkpoint_<iteration>.npy through a memory mapped file. The file is
+    written under a temporary name and renamed once flushed, so a run dying half way through a write
+    never leaves a broken checkpoint behind. Only the newest keep checkpoints are kept.
+    '''
+    path = os.path.join(directory, f'checkpoint_{iteration:010d}.npy')
+    tmp_path = path + '.tmp'
+    out = open_memmap(tmp_path, mode='w+', dtype=grid.dtype, shape=grid.shape)
+    copyto(out, grid)
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
+
+    for _, old_path in list_checkpoints(directory)[:-keep]:
+        os.remove(old_path)
+    return path
+
+def list_checkpoints(directory):
+    """All (iteration, path) checkpoints in directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = CHECKPOINT_PATTERN.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+def latest_checkpoint(directory, max_iteration=None):
+    """(iteration, path) of the newest checkpoint in directory, at most max_iteration, None if there is none"""
+    checkpoints = [(iteration, path) for iteration, path in list_checkpoints(directory)
+                   if max_iteration is None or iteration <= max_iteration]
+    return checkpoints[-1] if checkpoints else None
+
+class SnapshotWriter:
+    '''
+    Writes snapshots of the grid to directory/snapshot_<iteration>.npy on a background thread.
+    submit copies the grid into one of two buffers and returns right away, the thread saves the
+    other one meanwhile. The compute loop only waits when both buffers are still being written.
+    numpy releases the GIL while copying and writing, so the writes overlap with the steps.
+    '''
+
+    def __init__(self, directory, grid_shape, dtype=np.float64):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.free = queue.Queue()
+        for _ in range(2):
+            self.free.put(zeros(grid_shape, dtype=dtype))
+        self.pending = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            iteration, buffer = item
+            try:
+                if self.error is None:
+                    np.save(os.path.join(self.directory, f'snapshot_{iteration:010d}.npy'), buffer)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.free.put(buffer)
+
+    def submit(self, grid, iteration):
+        if self.error is not None:
+            raise self.error
+        buffer = self.free.get()
+        copyto(buffer, grid)
+        self.pending.put((iteration, buffer))
+
+    def close(self):
+        """Wait for the outstanding snapshots to be written"""
+        self.pending.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def run_experiment(num_iterations, grid_shape, return_grid=False, checkpoint_dir=None,
+                   checkpoint_every=1000, snapshot_dir=None, snapshot_every=100):
+    '''
+    Same simulation as run_experiment_further_mem_optimized. With a checkpoint_dir the grid is
+    checkpointed every checkpoint_every steps and at the end, and a run starts from the latest
+    checkpoint found there. With a snapshot_dir the grid is also streamed out every snapshot_every
+    steps without stalling the steps. Checkpoint writes are timed in 'checkpoint' spans.
+    Checkpoints past num_iterations are ignored, the run resumes from the newest one before it.
+    '''
+    # Initial grid
+    max_y, max_x = grid_shape
+    grid = zeros((max_y, max_x))
+    next_grid = zeros((max_y, max_x))
+
+    # Simulating a drop of dye in the middle of our simulated region
+    block_low = int(grid_shape[0] * 0.4)
+    block_high = int(grid_shape[0] * 0.5)
+
+    grid[block_low:block_high, block_low:block_high] = 0.005
+
+    start = 0
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        latest = latest_checkpoint(checkpoint_dir, num_iterations)
+        if latest is not None:
+            start, path = latest
+            saved = np.load(path, mmap_mode='r')
+            if saved.shape != grid.shape:
+                raise ValueError(f'Checkpoint {path} has shape {saved.shape}, expected {grid.shape}')
+            copyto(grid, saved)
+            del saved
+
+    snapshots = SnapshotWriter(snapshot_dir, grid_shape) if snapshot_dir is not None else None
+
+    # Running the experiment
+    try:
+        with span('run_experiment') as timing:
+            for i in range(start + 1, num_iterations + 1):
+                step(grid, next_grid, 0.1)
+                grid, next_grid = next_grid, grid # Inplace variable swap
+
+                if checkpoint_dir is not None and (i % checkpoint_every == 0 or i == num_iterations):
+                    with span('checkpoint'):
+                        save_checkpoint(checkpoint_dir, grid, i)
+                if snapshots is not None and i % snapshot_every == 0:
+                    with span('snapshot'):
+                        snapshots.submit(grid, i)
+    finally:
+        if snapshots is not None:
+            snapshots.close()
+
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
+
+def checkpoint_overhead_report(num_iterations, grid_shape, directory, checkpoint_every, snapshot_every):
+    """Time a plain run, a checkpointed run and a checkpointed run with snapshots and print the overhead"""
+    import shutil
+
+    baseline = run_experiment(num_iterations, grid_shape)
+    print(f"{'mode':>24} {'seconds':>9} {'overhead':>9} {'writes':>7} {'s/write':>8}")
+    print(f"{'none':>24} {baseline:>9.3f}")
+
+    for name, snapshot_dir in (('checkpoint', None), ('checkpoint + snapshots', os.path.join(directory, 'snapshots'))):
+        shutil.rmtree(directory, ignore_errors=True)
+        records.clear()
+        seconds = run_experiment(num_iterations, grid_shape, checkpoint_dir=os.path.join(directory, 'checkpoints'),
+                                 checkpoint_every=checkpoint_every, snapshot_dir=snapshot_dir,
+                                 snapshot_every=snapshot_every)
+        writes = [r['wall'] for r in records if r['name'] == 'checkpoint']
+        print(f'{name:>24} {seconds:>9.3f} {seconds / baseline - 1:>9.1%} {len(writes):>7} '
+              f'{sum(writes) / max(len(writes), 1):>8.4f}')
+    shutil.rmtree(directory, ignore_errors=True)
+
+if __name__== '__main__':
+    checkpoint_overhead_report(1000, (640, 640), 'diffusion_checkpoints', 100, 50)
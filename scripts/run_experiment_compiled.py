@@ -0,0 +1,182 @@
+
+import os
+import sys
+
+import numpy as np
+from numpy import zeros
+
+from instrumentation import span
+
+# cythonfn is built in place by `python setup.py build_ext --inplace` in the compiling related folder
+CYTHON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'compiling related')
+
+# Every loader returns a step(grid, next_grid, dt, D) writing the next grid into next_grid,
+# or raises ImportError when the compiler behind it is not installed. The loaders of NORM_KERNELS
+# return a step(grid, next_grid, dt, D, norm) that also returns the norm ('l2' or 'max') of the
+# change of the step, None when norm is None.
+
+def load_cython():
+    if CYTHON_DIR not in sys.path:
+        sys.path.append(CYTHON_DIR)
+    from cythonfn import diffusion_step_cython
+    return diffusion_step_cython
+
+NORM_CODES = {None: 0, 'l2': 1, 'max': 2}
+
+def compile_numba(norm=None):
+    '''
+    The numba step, which also returns the norm of the change of the step when norm is set. Each
+    row keeps its partial norm inside the single pass, summed (l2) or maxed afterwards. norm_code
+    is a compile time constant, so the step without a norm carries none of it.
+    '''
+    from numba import njit, prange
+    norm_code = NORM_CODES[norm]
+
+    @njit(parallel=True)
+    def diffusion_step_numba(grid, next_grid, dt, D = 1.0):
+        """One pass over the grid per step, rows spread over the cores. Same operations as the numpy step"""
+        max_y, max_x = grid.shape
+        coefficient = dt * D
+        partial = np.zeros(max_y if norm_code else 0)
+        for i in prange(max_y):
+            up = (i - 1 + max_y) % max_y
+            down = (i + 1) % max_y
+            row = 0.0
+            for j in range(max_x):
+                left = j - 1 if j > 0 else max_x - 1
+                right = j + 1 if j < max_x - 1 else 0
+                change = (grid[i, j] * -4 + grid[up, j] + grid[down, j]
+                          + grid[i, left] + grid[i, right]) * coefficient
+                next_grid[i, j] = change + grid[i, j]
+                if norm_code == 1:
+                    row += change * change
+                elif norm_code == 2:
+                    row = max(row, abs(change))
+            if norm_code:
+                partial[i] = row
+        if norm_code == 1:
+            return np.sqrt(partial.sum())
+        if norm_code == 2:
+            return partial.max()
+        return 0.0
+
+    # Compile now so that the first timed step does not pay for it
+    diffusion_step_numba(zeros((2, 2)), zeros((2, 2)), 0.1, 1.0)
+    return diffusion_step_numba
+
+def load_numba():
+    return compile_numba()
+
+def load_numba_norm():
+    steps = {norm: compile_numba(norm) for norm in ('l2', 'max')}
+    steps[None] = get_step('numba')
+
+    def diffusion_step_numba_norm(grid, next_grid, dt, D = 1.0, norm=None):
+        change = steps[norm](grid, next_grid, dt, D)
+        return float(change) if norm is not None else None
+    return diffusion_step_numba_norm
+
+def load_numpy():
+    from run_experiment_further_mem_optimized import step
+    return step
+
+def load_numpy_norm():
+    from run_experiment_converge import step
+    return step
+
+# Fastest first, auto selection picks the first one that loads
+KERNELS = {
+    'cython': load_cython,
+    'numba': load_numba,
+    'numpy': load_numpy,
+}
+
+# Kernels whose step can also return the norm of the change, for run_experiment_converge
+NORM_KERNELS = {
+    'numba': load_numba_norm,
+    'numpy': load_numpy_norm,
+}
+
+# Loaded steps by (kernel name, with_norm), and the ImportError of the ones that failed, so that
+# every kernel is imported (and numba compiles) once per process
+loaded_kernels = {}
+failed_kernels = {}
+
+def get_step(kernel=None, with_norm=False):
+    """The step of the requested kernel, or of the first one that loads when kernel is None"""
+    kernels = NORM_KERNELS if with_norm else KERNELS
+    if kernel is None:
+        kernel = default_kernel(with_norm)
+    if kernel not in kernels:
+        raise ValueError(f'Unknown diffusion kernel {kernel!r}, expected one of {list(kernels)}')
+    key = (kernel, with_norm)
+    if key in failed_kernels:
+        raise failed_kernels[key]
+    if key not in loaded_kernels:
+        try:
+            loaded_kernels[key] = kernels[kernel]()
+        except ImportError as e:
+            failed_kernels[key] = e
+            raise
+    return loaded_kernels[key]
+
+def available_kernels(with_norm=False):
+    """Names of the kernels that can be loaded on this host, fastest first"""
+    names = []
+    for name in (NORM_KERNELS if with_norm else KERNELS):
+        try:
+            get_step(name, with_norm)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+def default_kernel(with_norm=False):
+    """The kernel picked when none is requested"""
+    for name in (NORM_KERNELS if with_norm else KERNELS):
+        try:
+            get_step(name, with_norm)
+        except ImportError:
+            continue
+        return name
+    raise ImportError('No diffusion kernel could be loaded')
+
+def run_experiment(num_iterations, grid_shape, return_grid=False, kernel=None):
+
+    step = get_step(kernel)
+
+    # Initial grid
+    max_y, max_x = grid_shape
+    grid = zeros((max_y, max_x))
+    next_grid = zeros((max_y, max_x))
+
+    # Simulating a drop of dye in the middle of our simulated region
+    block_low = int(grid_shape[0] * 0.4)
+    block_high = int(grid_shape[0] * 0.5)
+
+    grid[block_low:block_high, block_low:block_high] = 0.005
+
+    # Running the experiment
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            step(grid, next_grid, 0.1, 1.0)
+            grid, next_grid = next_grid, grid # Inplace variable swap
+
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
+
+def bandwidth_report(num_iterations, grid_shape):
+    """
+    Time every available kernel and print the memory bandwidth it reaches, counting the single pass
+    of a compiled step (8 bytes read, 8 bytes written per cell) for all of them.
+    """
+    cells = grid_shape[0] * grid_shape[1]
+    print(f"{'kernel':>8} {'seconds':>9} {'ms/step':>8} {'GB/s':>6}")
+    for name in available_kernels():
+        seconds = run_experiment(num_iterations, grid_shape, kernel=name)
+        print(f'{name:>8} {seconds:>9.3f} {seconds / num_iterations * 1e3:>8.2f} '
+              f'{16 * cells * num_iterations / seconds / 1e9:>6.1f}')
+
+if __name__== '__main__':
+    bandwidth_report(20, (4096, 4096))
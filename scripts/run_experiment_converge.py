@@ -0,0 +1,90 @@
+
+import numpy as np
+from numpy import zeros
+
+from instrumentation import profile, span
+from run_experiment_compiled import NORM_KERNELS, get_step
+from run_experiment_further_mem_optimized import shift_vals
+
+NORMS = ('l2', 'max')
+
+def change_norm(change, norm):
+    """
+    Norm of the change of one step, as reductions over the buffer without temporaries.
+    These are extra read passes over the grid: one for l2, two (max and min) for max.
+    """
+    if norm == 'l2':
+        flat = change.reshape(-1)
+        return float(np.sqrt(np.dot(flat, flat)))
+    if norm == 'max':
+        return float(max(change.max(), -change.min()))
+    raise ValueError(f'Unknown norm {norm!r}, expected one of {NORMS}')
+
+@profile
+def step(grid, next_grid, dt, D = 1.0, norm=None):
+    '''
+    The further_mem_optimized step. Before grid is added back, next_grid holds exactly the change
+    of this step, so with a norm that change is measured right there and returned. That costs no
+    subtraction or temporary, but check steps still read the grid one (l2) or two (max) extra times.
+    '''
+    shift_vals(grid, next_grid)
+    next_grid *= dt * D
+    change = change_norm(next_grid, norm) if norm is not None else None
+    next_grid += grid
+    return change
+
+def run_until_converged(max_iterations, grid_shape, tolerance, norm='l2', check_every=10, return_grid=False,
+                        kernel=None):
+    '''
+    Step until the norm of the change of a step drops below tolerance, checking every check_every
+    steps, or until max_iterations. Returns the elapsed seconds, the number of iterations run and
+    the history as (iteration, change) pairs, plus the grid when return_grid is set.
+    kernel is one of NORM_KERNELS of run_experiment_compiled, by default the first that loads;
+    the numba one measures the change inside its single pass, this module's step does not.
+    '''
+    if norm not in NORMS:
+        raise ValueError(f'Unknown norm {norm!r}, expected one of {NORMS}')
+
+    step = get_step(kernel, with_norm=True)
+
+    # Initial grid
+    max_y, max_x = grid_shape
+    grid = zeros((max_y, max_x))
+    next_grid = zeros((max_y, max_x))
+
+    # Simulating a drop of dye in the middle of our simulated region
+    block_low = int(grid_shape[0] * 0.4)
+    block_high = int(grid_shape[0] * 0.5)
+
+    grid[block_low:block_high, block_low:block_high] = 0.005
+
+    history = []
+    iterations = 0
+
+    # Running the experiment
+    with span('run_until_converged') as timing:
+        while iterations < max_iterations:
+            iterations += 1
+            check = iterations % check_every == 0
+            change = step(grid, next_grid, 0.1, norm=norm if check else None)
+            grid, next_grid = next_grid, grid # Inplace variable swap
+
+            if check:
+                history.append((iterations, change))
+                if change < tolerance:
+                    break
+
+    if return_grid:
+        return timing['wall'], iterations, history, grid
+    return timing['wall'], iterations, history
+
+if __name__== '__main__':
+    from run_experiment_compiled import run_experiment
+
+    for kernel in NORM_KERNELS:
+        for norm, tolerance in (('l2', 1e-7), ('max', 1e-9)):
+            seconds, iterations, history = run_until_converged(100_000, (128, 128), tolerance, norm,
+                                                               check_every=50, kernel=kernel)
+            fixed = run_experiment(iterations, (128, 128), kernel=kernel)
+            print(f'{kernel:>5} {norm:>3} < {tolerance:g}: converged after {iterations} iterations in {seconds:0.2f} '
+                  f'seconds ({fixed:0.2f} seconds for the same number of fixed steps), last change {history[-1][1]:.2e}')
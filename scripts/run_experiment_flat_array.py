@@ -0,0 +1,68 @@
+
+from array import array
+
+from instrumentation import profile, span
+
+def neighbour_rows(max_y, max_x):
+    '''
+    Flat start index of the row above and the row below every row of a row major max_y x max_x
+    grid, wrapping around at the edges. Computed once so that the step does not have to do any
+    modulo arithmetic.
+    '''
+    up = array('l', (((i - 1) % max_y) * max_x for i in range(max_y)))
+    down = array('l', (((i + 1) % max_y) * max_x for i in range(max_y)))
+    return up, down
+
+@profile
+def step(grid, next_grid, neighbours, max_x, dt, D = 1.0):
+    '''
+    Works one row at a time: the row and its four neighbours are sliced out of the flat grid
+    (left and right are the row rotated by one), so the inner loop is a comprehension over zip
+    without any indexing. Only the up/down wrap around is precomputed; left/right cost two row
+    sized copies per row, which is small next to the per cell float arithmetic. A whole grid
+    variant over zero copy memoryview shifts with precomputed edge indices was no faster.
+    This is about 1.5-2x faster than the fixed nested lists, not more: every cell is still
+    boxed floats in the interpreter.
+    '''
+    up, down = neighbours
+    coefficient = dt * D
+
+    for start, up_start, down_start in zip(range(0, len(grid), max_x), up, down):
+        row = grid[start:start + max_x]
+        next_grid[start:start + max_x] = array('d', [
+            value + coefficient * (u + d + l + r - 4 * value)
+            for value, u, d, l, r in zip(row,
+                                         grid[up_start:up_start + max_x],
+                                         grid[down_start:down_start + max_x],
+                                         row[-1:] + row[:-1],
+                                         row[1:] + row[:1])
+        ])
+
+def run_experiment(num_iterations, grid_shape, return_grid=False):
+
+    # Initial grid, flat and row major. No numpy needed.
+    max_y, max_x = grid_shape
+    grid = array('d', bytes(8 * max_y * max_x))
+    next_grid = array('d', grid)
+    neighbours = neighbour_rows(max_y, max_x)
+
+    # Simulating a drop of dye in the middle of our simulated region
+    block_low = int(grid_shape[0] * 0.4)
+    block_high = int(grid_shape[0] * 0.5)
+
+    for i in range(block_low, block_high):
+        for j in range(block_low, block_high):
+            grid[i * max_x + j] = 0.005
+
+    # Running the experiment
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            step(grid, next_grid, neighbours, max_x, 0.1)
+            grid, next_grid = next_grid, grid # Double buffering, swap instead of allocating
+
+    if return_grid:
+        return timing['wall'], [grid[i * max_x:(i + 1) * max_x] for i in range(max_y)]
+    return timing['wall']
+
+if __name__== '__main__':
+    run_experiment(150, (640, 640))
@@ -1,6 +1,6 @@
 
-import time
-from numpy import roll, zeros, copyto, asarray, all
+from instrumentation import profile, span
+from numpy import roll, zeros, copyto, asarray, all, float64
 
 def shift_sum_optimized(grid, shift_val, axis, next_grid):
     '''
@@ -28,25 +28,25 @@ def test_shift_sum_optimized():
 
 def shift_vals(grid, next_grid):
     copyto(next_grid, grid)
+    next_grid *= -4
     shift_sum_optimized(grid, +1, 0, next_grid)
     shift_sum_optimized(grid, -1, 0, next_grid)
     shift_sum_optimized(grid, +1, 1, next_grid)
     shift_sum_optimized(grid, -1, 1, next_grid)
-    next_grid *= -4
 
 @profile
 def step(grid, next_grid, dt, D = 1.0):
     shift_vals(grid, next_grid)
     next_grid *= dt * D
-    grid += next_grid
+    next_grid += grid
 
 
-def run_experiment(num_iterations, grid_shape):
+def run_experiment(num_iterations, grid_shape, return_grid=False, dtype=float64):
 
     # Initial grid
     max_y, max_x = grid_shape
-    grid = zeros((max_y, max_x))
-    next_grid = zeros((max_y, max_x))
+    grid = zeros((max_y, max_x), dtype=dtype)
+    next_grid = zeros((max_y, max_x), dtype=dtype)
 
     # Simulating a drop of dye in the middle of our simulated region
     block_low = int(grid_shape[0] * 0.4)
@@ -55,12 +55,14 @@ def run_experiment(num_iterations, grid_shape):
     grid[block_low:block_high, block_low:block_high] = 0.005
 
     # Running the experiment
-    st = time.time()
-    for _ in range(num_iterations):
-        step(grid, next_grid, 0.1)
-        grid, next_grid = next_grid, grid # Inplace variable swap
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            step(grid, next_grid, 0.1)
+            grid, next_grid = next_grid, grid # Inplace variable swap
 
-    return time.time() - st
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
             
 test_shift_sum_optimized()
 
@@ -1,29 +1,29 @@
 
-import time
-from numpy import roll, zeros, copyto
+from instrumentation import profile, span
+from numpy import roll, zeros, copyto, float64
 
 
 def shift_vals(grid, next_grid):
     copyto(next_grid, grid)
+    next_grid *= -4
     next_grid +=  roll(grid, +1, 0)
     next_grid +=  roll(grid, -1, 0)
     next_grid +=  roll(grid, +1, 1)
     next_grid +=  roll(grid, -1, 1)
-    next_grid *= -4
 
 @profile
 def step(grid, next_grid, dt, D = 1.0):
     shift_vals(grid, next_grid)
     next_grid *= dt * D
-    grid += next_grid
+    next_grid += grid
 
 
-def run_experiment(num_iterations, grid_shape):
+def run_experiment(num_iterations, grid_shape, return_grid=False, dtype=float64):
 
     # Initial grid
     max_y, max_x = grid_shape
-    grid = zeros((max_y, max_x))
-    next_grid = zeros((max_y, max_x))
+    grid = zeros((max_y, max_x), dtype=dtype)
+    next_grid = zeros((max_y, max_x), dtype=dtype)
 
     # Simulating a drop of dye in the middle of our simulated region
     block_low = int(grid_shape[0] * 0.4)
@@ -32,12 +32,14 @@ def run_experiment(num_iterations, grid_shape):
     grid[block_low:block_high, block_low:block_high] = 0.005
 
     # Running the experiment
-    st = time.time()
-    for _ in range(num_iterations):
-        step(grid, next_grid, 0.1)
-        grid, next_grid = next_grid, grid # Inplace variable swap
-
-    return time.time() - st
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            step(grid, next_grid, 0.1)
+            grid, next_grid = next_grid, grid # Inplace variable swap
+
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
 
 if __name__== '__main__':
     run_experiment(150, (640,640))
@@ -0,0 +1,132 @@
+
+import os
+from multiprocessing import Barrier, Process, shared_memory
+
+import numpy as np
+from numpy import copyto
+
+from instrumentation import span
+from run_experiment_further_mem_optimized import shift_sum_optimized
+
+def create_slabs(max_y, num_workers):
+    """Split the rows into num_workers contiguous (row_from, row_to) slabs of (almost) equal size"""
+    bounds = [max_y * i // num_workers for i in range(num_workers + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(num_workers) if bounds[i] < bounds[i + 1]]
+
+def step_slab(grid, next_grid, row_from, row_to, dt, D = 1.0):
+    '''
+    Calculate the rows [row_from, row_to) of next_grid. The halo, the row above and the row below
+    the slab (periodic), is read straight from the neighbouring slabs in the shared grid.
+    Same operations in the same order as step in run_experiment_further_mem_optimized.
+    '''
+    max_y = grid.shape[0]
+    slab = grid[row_from:row_to]
+    out = next_grid[row_from:row_to]
+
+    copyto(out, slab)
+    out *= -4
+    # Row above, shift +1 along axis 0
+    out[1:] += grid[row_from:row_to - 1]
+    out[:1] += grid[(row_from - 1) % max_y]
+    # Row below, shift -1 along axis 0
+    out[-1:] += grid[row_to % max_y]
+    out[:-1] += grid[row_from + 1:row_to]
+    # Left and right, the slab has whole rows so these never leave it
+    shift_sum_optimized(slab, +1, 1, out)
+    shift_sum_optimized(slab, -1, 1, out)
+    out *= dt * D
+    out += slab
+
+def worker(shm_names, grid_shape, row_from, row_to, num_iterations, start_barrier, barrier, dt):
+    shms = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    grid, next_grid = [np.ndarray(grid_shape, dtype=np.float64, buffer=shm.buf) for shm in shms]
+
+    try:
+        start_barrier.wait() # Everybody attached, start the clock
+        for _ in range(num_iterations):
+            step_slab(grid, next_grid, row_from, row_to, dt)
+            # Nobody may read the halo of the next step before every slab is written
+            barrier.wait()
+            grid, next_grid = next_grid, grid
+    except BaseException:
+        # Do not leave the others waiting forever
+        start_barrier.abort()
+        barrier.abort()
+        raise
+    finally:
+        del grid, next_grid
+        for shm in shms:
+            shm.close()
+
+def run_experiment(num_iterations, grid_shape, num_workers=None, return_grid=False):
+
+    if num_workers is None:
+        num_workers = os.cpu_count()
+
+    # Initial grid, both buffers live in shared memory
+    max_y, max_x = grid_shape
+    nbytes = max_y * max_x * np.dtype(np.float64).itemsize
+    shms = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(2)]
+    try:
+        grid, next_grid = [np.ndarray(grid_shape, dtype=np.float64, buffer=shm.buf) for shm in shms]
+        grid[:] = 0
+        next_grid[:] = 0
+
+        # Simulating a drop of dye in the middle of our simulated region
+        block_low = int(grid_shape[0] * 0.4)
+        block_high = int(grid_shape[0] * 0.5)
+
+        grid[block_low:block_high, block_low:block_high] = 0.005
+
+        slabs = create_slabs(max_y, num_workers)
+        start_barrier = Barrier(len(slabs) + 1)
+        barrier = Barrier(len(slabs))
+        processes = [Process(target=worker,
+                             args=([shm.name for shm in shms], grid_shape, row_from, row_to,
+                                   num_iterations, start_barrier, barrier, 0.1))
+                     for row_from, row_to in slabs]
+        for p in processes:
+            p.start()
+
+        # Running the experiment
+        start_barrier.wait()
+        with span('run_experiment') as timing:
+            for p in processes:
+                p.join()
+
+        if any(p.exitcode != 0 for p in processes):
+            raise RuntimeError('A diffusion worker failed')
+
+        result = (grid, next_grid)[num_iterations % 2].copy()
+        del grid, next_grid
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    if return_grid:
+        return timing['wall'], result
+    return timing['wall']
+
+def scaling_report(num_iterations, grid_shape, worker_counts):
+    """
+    Time the run for every worker count and print the speedup and parallel efficiency.
+    Both are relative to the first worker count, which should normally be 1.
+    """
+    baseline = None
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'efficiency':>11}")
+    for num_workers in worker_counts:
+        seconds = run_experiment(num_iterations, grid_shape, num_workers)
+        if baseline is None:
+            baseline = seconds * worker_counts[0]
+        speedup = baseline / seconds
+        print(f'{num_workers:>8} {seconds:>9.3f} {speedup:>8.2f} {speedup / num_workers:>11.1%}')
+
+if __name__== '__main__':
+    from run_experiment_further_mem_optimized import run_experiment as run_experiment_serial
+
+    _, expected = run_experiment_serial(150, (640, 640), return_grid=True)
+    _, result = run_experiment(150, (640, 640), return_grid=True)
+    print('Matches the serial solver:', np.allclose(result, expected, rtol=0, atol=1e-15))
+
+    scaling_report(150, (640, 640), [1, 2, 4, os.cpu_count()])
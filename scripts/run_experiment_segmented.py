@@ -1,5 +1,5 @@
 
-import time
+from instrumentation import profile, span
 
 @profile
 def step(grid, dt, grid_next, D = 1.0):
@@ -17,12 +17,13 @@ def step(grid, dt, grid_next, D = 1.0):
             grid_next[i][j] = grid[i][j] + D * dt * (x_dir_gradient2 + y_dir_gradient2)
 
 
-def run_experiment(num_iterations, grid_shape):
+def run_experiment(num_iterations, grid_shape, return_grid=False):
 
     # Initial grid
     max_y, max_x = grid_shape
 
-    grid = [[0.0]*max_x]*max_y
+    # One list per row, [[0.0]*max_x]*max_y would make every row the same list
+    grid = [[0.0]*max_x for _ in range(max_y)]
 
     # Simulating a drop of dye in the middle of our simulated region
     block_low = int(grid_shape[0] * 0.4)
@@ -34,17 +35,19 @@ def run_experiment(num_iterations, grid_shape):
 
 
     # Predefining the next grid
-    grid_next = [[0.0]*max_x]*max_y
+    grid_next = [[0.0]*max_x for _ in range(max_y)]
 
     # Running the experiment
-    st = time.time()
-    for _ in range(num_iterations):
-        step(grid, 0.1, grid_next)
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            step(grid, 0.1, grid_next)
 
-        # Swapping the variables because values inside grid does not matter for next iteration
-        grid, grid_next = grid_next, grid
+            # Swapping the variables because values inside grid does not matter for next iteration
+            grid, grid_next = grid_next, grid
 
-    return time.time() - st
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
 
 if __name__== '__main__':
     run_experiment(150, (640, 640))
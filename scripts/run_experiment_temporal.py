@@ -0,0 +1,105 @@
+
+import numpy as np
+from numpy import copyto, zeros
+
+from instrumentation import profile, span
+from run_experiment_further_mem_optimized import shift_sum_optimized
+
+def choose_band_rows(grid_shape, steps_per_pass, cache_bytes=1 << 20):
+    '''
+    Rows per band so that the two working buffers of a band, ghost rows included,
+    fit into cache_bytes (about the size of an L2 cache).
+    '''
+    max_y, max_x = grid_shape
+    rows = cache_bytes // (2 * 8 * max_x) - 2 * steps_per_pass
+    return int(min(max_y, max(rows, steps_per_pass, 1)))
+
+def bytes_per_cell_update(grid_shape, steps_per_pass=4, band_rows=None):
+    '''
+    Estimated bytes moved to and from main memory per cell update. Every pass reads each band
+    with its ghost rows once and writes its interior once, then the band is advanced
+    steps_per_pass steps in cache.
+    '''
+    if band_rows is None:
+        band_rows = choose_band_rows(grid_shape, steps_per_pass)
+    read = 8 * (band_rows + 2 * steps_per_pass) / band_rows
+    write = 8
+    return (read + write) / steps_per_pass
+
+def advance_band(band, work, num_steps, dt, D = 1.0):
+    '''
+    Advance band num_steps steps. The first and last num_steps rows are ghost rows: every step
+    the rows that are still valid shrink by one on each side, so after num_steps steps only the
+    interior is valid. Columns are periodic, band always holds whole rows.
+    Same operations in the same order as step in run_experiment_further_mem_optimized.
+    Returns the buffer holding the result.
+    '''
+    num_rows = band.shape[0]
+    for s in range(num_steps):
+        low, high = s + 1, num_rows - s - 1
+        grid = band[low:high]
+        out = work[low:high]
+
+        copyto(out, grid)
+        out *= -4
+        out += band[low - 1:high - 1] # Row above
+        out += band[low + 1:high + 1] # Row below
+        shift_sum_optimized(grid, +1, 1, out)
+        shift_sum_optimized(grid, -1, 1, out)
+        out *= dt * D
+        out += grid
+
+        band, work = work, band
+    return band
+
+@profile
+def step(grid, next_grid, num_steps, band_rows, buffers, dt, D = 1.0):
+    '''
+    Advance the whole grid num_steps steps, one band of band_rows rows at a time. Every band
+    is loaded with num_steps ghost rows on each side (periodic) and then stays in cache for
+    all num_steps steps before its interior is written to next_grid.
+    '''
+    max_y = grid.shape[0]
+    for row_from in range(0, max_y, band_rows):
+        row_to = min(row_from + band_rows, max_y)
+        num_rows = row_to - row_from + 2 * num_steps
+
+        band, work = buffers[0][:num_rows], buffers[1][:num_rows]
+        rows = np.arange(row_from - num_steps, row_to + num_steps) % max_y
+        np.take(grid, rows, axis=0, out=band)
+
+        band = advance_band(band, work, num_steps, dt, D)
+        next_grid[row_from:row_to] = band[num_steps:num_rows - num_steps]
+
+def run_experiment(num_iterations, grid_shape, return_grid=False, steps_per_pass=4, band_rows=None):
+
+    # Initial grid
+    max_y, max_x = grid_shape
+    grid = zeros((max_y, max_x))
+    next_grid = zeros((max_y, max_x))
+
+    if band_rows is None:
+        band_rows = choose_band_rows(grid_shape, steps_per_pass)
+    buffers = [zeros((band_rows + 2 * steps_per_pass, max_x)) for _ in range(2)]
+
+    # Simulating a drop of dye in the middle of our simulated region
+    block_low = int(grid_shape[0] * 0.4)
+    block_high = int(grid_shape[0] * 0.5)
+
+    grid[block_low:block_high, block_low:block_high] = 0.005
+
+    # Running the experiment, steps_per_pass steps per pass over memory
+    with span('run_experiment') as timing:
+        remaining = num_iterations
+        while remaining:
+            num_steps = min(steps_per_pass, remaining)
+            step(grid, next_grid, num_steps, band_rows, buffers, 0.1)
+            grid, next_grid = next_grid, grid
+            remaining -= num_steps
+
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
+
+if __name__== '__main__':
+    run_experiment(150, (640,640))
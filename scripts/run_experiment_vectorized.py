@@ -1,6 +1,6 @@
 
-import time
-from numpy import roll, zeros
+from instrumentation import profile, span
+from numpy import roll, zeros, float64
 
 
 def shift_vals(grid):
@@ -17,12 +17,12 @@ def step(grid, dt, D = 1.0):
     return grid + dt * D * shift_vals(grid)
 
 
-def run_experiment(num_iterations, grid_shape):
+def run_experiment(num_iterations, grid_shape, return_grid=False, dtype=float64):
 
     # Initial grid
     max_y, max_x = grid_shape
 
-    grid = zeros((max_y, max_x))
+    grid = zeros((max_y, max_x), dtype=dtype)
 
     # Simulating a drop of dye in the middle of our simulated region
     block_low = int(grid_shape[0] * 0.4)
@@ -31,11 +31,13 @@ def run_experiment(num_iterations, grid_shape):
     grid[block_low:block_high, block_low:block_high] = 0.005
 
     # Running the experiment
-    st = time.time()
-    for _ in range(num_iterations):
-        grid = step(grid, 0.1)
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            grid = step(grid, 0.1)
 
-    return time.time() - st
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
 
 if __name__== '__main__':
     run_experiment(150, (640,640))
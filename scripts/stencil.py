@@ -0,0 +1,210 @@
+'''
+Stencils over N-D grids, evaluated in place with slice adds the way shift_sum_optimized does it.
+
+A stencil is a list of (offset, weight) pairs, out[x] = sum of weight * grid[x + offset].
+Cells outside the grid are handled by the boundary:
+
+    periodic - wrap around
+    fixed    - have the constant value fill (Dirichlet)
+    reflect  - mirror the grid at its edge, the edge cell included (zero flux)
+'''
+
+import time
+from itertools import product
+
+import numpy as np
+from numpy import float64, roll, zeros
+
+from instrumentation import profile, span
+
+BOUNDARIES = ('periodic', 'fixed', 'reflect')
+
+def laplacian(ndim=2):
+    """The 2 * ndim + 1 point Laplacian, in the same order as shift_vals in run_experiment_further_mem_optimized"""
+    stencil = [((0,) * ndim, -2.0 * ndim)]
+    for axis in range(ndim):
+        for shift in (-1, +1):
+            offset = [0] * ndim
+            offset[axis] = shift
+            stencil.append((tuple(offset), 1.0))
+    return stencil
+
+def nine_point(weight_y=1.0, weight_x=1.0, weight_diagonal=0.0):
+    """2-D nine point Laplacian with separate weights along y, along x and along the diagonals"""
+    stencil = [((0, 0), -2.0 * weight_y - 2.0 * weight_x - 4.0 * weight_diagonal)]
+    stencil += [((dy, 0), weight_y) for dy in (-1, +1)]
+    stencil += [((0, dx), weight_x) for dx in (-1, +1)]
+    if weight_diagonal:
+        stencil += [((dy, dx), weight_diagonal) for dy in (-1, +1) for dx in (-1, +1)]
+    return stencil
+
+def axis_pieces(n, shift, boundary):
+    '''
+    Split one axis of length n into (destination, source) slice pairs for out[x] += grid[x + shift].
+    A source of None means the destination cells are outside the grid and take the fill value.
+    '''
+    if shift == 0:
+        return [(slice(None), slice(None))]
+    if boundary == 'periodic':
+        shift %= n
+        if shift == 0:
+            return [(slice(None), slice(None))]
+        return [(slice(0, n - shift), slice(shift, n)), (slice(n - shift, n), slice(0, shift))]
+    if abs(shift) > n:
+        raise ValueError(f'Offset {shift} is larger than the axis length {n}')
+
+    k = abs(shift)
+    if shift > 0:
+        inside, outside = (slice(0, n - k), slice(k, n)), slice(n - k, n)
+        mirrored = slice(n - 1, n - k - 1 if n - k > 0 else None, -1)
+    else:
+        inside, outside = (slice(k, n), slice(0, n - k)), slice(0, k)
+        mirrored = slice(k - 1, None, -1)
+
+    if boundary == 'fixed':
+        return [inside, (outside, None)]
+    if boundary == 'reflect':
+        return [inside, (outside, mirrored)]
+    raise ValueError(f'Unknown boundary {boundary!r}, expected one of {BOUNDARIES}')
+
+def shift_sum(grid, offset, out, boundary='periodic', fill=0.0, assign=False):
+    '''
+    out[x] += grid[x + offset] for an N-D offset, without temporaries. The grid is cut into the
+    pieces of every axis, each piece is one slice add. With assign the pieces are copied instead
+    of added, which initialises all of out.
+    '''
+    pieces = [axis_pieces(n, shift, boundary) for n, shift in zip(grid.shape, offset)]
+    for combination in product(*pieces):
+        destination = tuple(d for d, _ in combination)
+        sources = [s for _, s in combination]
+        if any(s is None for s in sources):
+            if assign:
+                out[destination] = fill
+            elif fill:
+                out[destination] += fill
+        elif assign:
+            out[destination] = grid[tuple(sources)]
+        else:
+            out[destination] += grid[tuple(sources)]
+
+def group_by_weight(stencil):
+    """[(weight, [offsets])] in the order the weights first appear, zero weights dropped"""
+    groups = {}
+    for offset, weight in stencil:
+        if weight:
+            groups.setdefault(weight, []).append(tuple(offset))
+    return list(groups.items())
+
+@profile
+def apply_stencil(grid, stencil, out, boundary='periodic', fill=0.0):
+    '''
+    out = the stencil applied to grid. Offsets are summed group by group of equal weight and the
+    running sum is rescaled between groups, (S1 * w1 / w2 + S2) * w2 ..., so no pass needs a temporary.
+    For the Laplacian this is copy, *= -4, four slice adds, the same operations as shift_vals.
+    '''
+    groups = group_by_weight(stencil)
+    if not groups:
+        out[...] = 0
+        return out
+
+    for i, (weight, offsets) in enumerate(groups):
+        for j, offset in enumerate(offsets):
+            shift_sum(grid, offset, out, boundary, fill, assign=(i == 0 and j == 0))
+        scale = weight / groups[i + 1][0] if i + 1 < len(groups) else weight
+        if scale != 1:
+            out *= scale
+    return out
+
+def apply_stencil_roll(grid, stencil, boundary='periodic', fill=0.0):
+    """Reference evaluation with a temporary per offset, numpy.roll for periodic and numpy.pad otherwise"""
+    if boundary == 'periodic':
+        return sum(weight * roll(grid, [-o for o in offset], axis=tuple(range(grid.ndim)))
+                   for offset, weight in stencil)
+
+    width = [max(abs(offset[axis]) for offset, _ in stencil) for axis in range(grid.ndim)]
+    if boundary == 'fixed':
+        padded = np.pad(grid, [(w, w) for w in width], mode='constant', constant_values=fill)
+    elif boundary == 'reflect':
+        padded = np.pad(grid, [(w, w) for w in width], mode='symmetric')
+    else:
+        raise ValueError(f'Unknown boundary {boundary!r}, expected one of {BOUNDARIES}')
+    return sum(weight * padded[tuple(slice(w + o, w + o + n) for w, o, n in zip(width, offset, grid.shape))]
+               for offset, weight in stencil)
+
+@profile
+def step(grid, next_grid, stencil, dt, D = 1.0, boundary='periodic', fill=0.0):
+    apply_stencil(grid, stencil, next_grid, boundary, fill)
+    next_grid *= dt * D
+    next_grid += grid
+
+def run_experiment(num_iterations, grid_shape, return_grid=False, dtype=float64, stencil=None,
+                   boundary='periodic', fill=0.0):
+    '''
+    Diffusion over a grid of any dimension. The defaults, the 2-D Laplacian with periodic
+    boundaries, give exactly the results of run_experiment_further_mem_optimized.
+    '''
+    if stencil is None:
+        stencil = laplacian(len(grid_shape))
+
+    # Initial grid
+    grid = zeros(grid_shape, dtype=dtype)
+    next_grid = zeros(grid_shape, dtype=dtype)
+
+    # Simulating a drop of dye in the middle of our simulated region
+    block_low = int(grid_shape[0] * 0.4)
+    block_high = int(grid_shape[0] * 0.5)
+
+    grid[(slice(block_low, block_high),) * len(grid_shape)] = 0.005
+
+    # Running the experiment
+    with span('run_experiment') as timing:
+        for _ in range(num_iterations):
+            step(grid, next_grid, stencil, 0.1, boundary=boundary, fill=fill)
+            grid, next_grid = next_grid, grid # Inplace variable swap
+
+    if return_grid:
+        return timing['wall'], grid
+    return timing['wall']
+
+def test_apply_stencil():
+    rng = np.random.default_rng(0)
+    for shape, stencil in (((5, 7), laplacian(2)), ((4, 5, 6), laplacian(3)),
+                           ((6, 5), nine_point(1.0, 0.5, 0.25)), ((3, 8), [((0, 3), 2.0), ((-2, -1), -1.5)])):
+        grid = rng.random(shape)
+        for boundary in BOUNDARIES:
+            out = np.full(shape, np.nan)
+            apply_stencil(grid, stencil, out, boundary, fill=0.3)
+            assert np.allclose(out, apply_stencil_roll(grid, stencil, boundary, fill=0.3))
+
+def stencil_benchmark(cases, repeats=5):
+    """Time apply_stencil against the roll evaluation for every (name, shape, stencil, boundary) case"""
+    print(f"{'stencil':>16} {'shape':>16} {'boundary':>9} {'roll s':>9} {'slices s':>9} {'speedup':>8} {'max diff':>10}")
+    for name, shape, stencil, boundary in cases:
+        grid = np.random.default_rng(0).random(shape)
+        out = np.empty_like(grid)
+
+        timings = []
+        for evaluate in (lambda: apply_stencil_roll(grid, stencil, boundary),
+                         lambda: apply_stencil(grid, stencil, out, boundary)):
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                evaluate()
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+            timings.append(best)
+
+        diff = float(np.abs(apply_stencil_roll(grid, stencil, boundary) - out).max())
+        print(f"{name:>16} {'x'.join(map(str, shape)):>16} {boundary:>9} {timings[0]:>9.4f} {timings[1]:>9.4f} "
+              f"{timings[0] / timings[1]:>8.2f} {diff:>10.2e}")
+
+test_apply_stencil()
+
+if __name__== '__main__':
+    stencil_benchmark([
+        ('laplacian 2-D', (2048, 2048), laplacian(2), 'periodic'),
+        ('laplacian 2-D', (2048, 2048), laplacian(2), 'reflect'),
+        ('nine point 2-D', (2048, 2048), nine_point(1.0, 0.5, 0.25), 'periodic'),
+        ('laplacian 3-D', (160, 160, 160), laplacian(3), 'periodic'),
+        ('laplacian 3-D', (160, 160, 160), laplacian(3), 'fixed'),
+    ])